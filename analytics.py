@@ -0,0 +1,274 @@
+import json
+import sys
+import time
+from datetime import datetime, timedelta, date
+from sqlalchemy import Column, Integer, String, Date, Float, Index, func, desc
+from sqlalchemy.dialects import postgresql, sqlite
+from lms_models import Base, SessionLocal, engine, Book, Member, Transaction
+
+# --- 1. Aggregate Tables ---
+# Filled by refresh_analytics() from the transactions table, so reports never
+# scan the full loan history.
+
+class DailyBookLoans(Base):
+    __tablename__ = "analytics_daily_loans"
+    __table_args__ = (Index("ix_analytics_daily_loans_day", "day"),)
+
+    day = Column(Date, primary_key=True)
+    book_id = Column(Integer, primary_key=True)
+    category = Column(String)
+    loans = Column(Integer, nullable=False, default=0)
+
+class BookUsage(Base):
+    __tablename__ = "analytics_book_usage"
+
+    book_id = Column(Integer, primary_key=True)
+    loans = Column(Integer, nullable=False, default=0)
+    returns = Column(Integer, nullable=False, default=0)
+    days_on_loan = Column(Integer, nullable=False, default=0) # Summed over returned loans
+
+class MemberActivity(Base):
+    __tablename__ = "analytics_member_activity"
+    __table_args__ = (Index("ix_analytics_member_activity_loans", "loans"),)
+
+    member_id = Column(Integer, primary_key=True)
+    loans = Column(Integer, nullable=False, default=0)
+    returns = Column(Integer, nullable=False, default=0)
+    late_returns = Column(Integer, nullable=False, default=0)
+    fines = Column(Float, nullable=False, default=0.0)
+
+class ReturnLatency(Base):
+    __tablename__ = "analytics_return_latency"
+
+    # Days between due date and return (negative = returned early), clamped to the range below
+    days_late = Column(Integer, primary_key=True)
+    returns = Column(Integer, nullable=False, default=0)
+
+class AnalyticsState(Base):
+    __tablename__ = "analytics_state"
+
+    name = Column(String, primary_key=True)
+    value = Column(String)
+
+AGGREGATE_TABLES = [t.__table__ for t in (DailyBookLoans, BookUsage, MemberActivity, ReturnLatency, AnalyticsState)]
+LATENCY_RANGE = (-30, 60)
+
+def initialize_analytics(bind=None):
+    """Creates the aggregate tables if they do not exist."""
+    Base.metadata.create_all(bind=bind or engine, tables=AGGREGATE_TABLES)
+
+# --- 2. Incremental Refresh ---
+
+def _get_state(db_session, name: str, default=None):
+    row = db_session.query(AnalyticsState.value).filter(AnalyticsState.name == name).first()
+    return row.value if row else default
+
+def _set_state(db_session, name: str, value):
+    db_session.merge(AnalyticsState(name=name, value=str(value)))
+
+def _add_to(db_session, model, rows: list, increments: tuple, replacements: tuple = ()):
+    """Upserts rows, adding the 'increments' columns onto any existing row with the same primary key."""
+    if not rows:
+        return
+    table = model.__table__
+    dialect = db_session.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        insert = (sqlite.insert if dialect == "sqlite" else postgresql.insert)(table)
+        updates = {name: table.c[name] + insert.excluded[name] for name in increments}
+        updates.update({name: insert.excluded[name] for name in replacements})
+        statement = insert.on_conflict_do_update(index_elements=[c.name for c in table.primary_key], set_=updates)
+        db_session.execute(statement, rows)
+        return
+    for row in rows:
+        existing = db_session.get(model, tuple(row[c.name] for c in table.primary_key))
+        if existing is None:
+            db_session.add(model(**row))
+        else:
+            for name in increments:
+                setattr(existing, name, getattr(existing, name) + row[name])
+            for name in replacements:
+                setattr(existing, name, row[name])
+
+def _days_between(db_session, later, earlier):
+    if db_session.get_bind().dialect.name == "sqlite":
+        return func.julianday(later) - func.julianday(earlier)
+    return later - earlier
+
+def refresh_analytics(db_session) -> dict:
+    """
+    Folds transactions changed since the last run into the aggregate tables.
+
+    New loans are found by transaction_id above the stored high-water mark.
+    Returns are taken by return_date, for whole days after the last processed
+    day up to yesterday, so today's returns are counted on the next run.
+    """
+    started = time.perf_counter()
+    last_transaction_id = int(_get_state(db_session, "last_transaction_id", 0))
+    last_return_day = date.fromisoformat(_get_state(db_session, "last_return_day", "1900-01-01"))
+    yesterday = datetime.now().date() - timedelta(days=1)
+
+    # 1. New loans since the high-water mark
+    max_transaction_id = db_session.query(func.max(Transaction.transaction_id)).scalar() or 0
+    new_loans = (Transaction.transaction_id > last_transaction_id, Transaction.transaction_id <= max_transaction_id)
+    daily_rows = [
+        {"day": row.issue_date, "book_id": row.book_id, "category": row.category, "loans": row.loans}
+        for row in db_session.query(
+            Transaction.issue_date, Transaction.book_id, Book.category, func.count().label("loans")
+        ).outerjoin(Book, Transaction.book_id == Book.book_id).filter(*new_loans).group_by(
+            Transaction.issue_date, Transaction.book_id, Book.category
+        )
+    ]
+    _add_to(db_session, DailyBookLoans, daily_rows, increments=("loans",), replacements=("category",))
+    _add_to(db_session, BookUsage, [
+        {"book_id": row.book_id, "loans": row.loans, "returns": 0, "days_on_loan": 0}
+        for row in db_session.query(Transaction.book_id, func.count().label("loans")).filter(*new_loans).group_by(Transaction.book_id)
+    ], increments=("loans",))
+    _add_to(db_session, MemberActivity, [
+        {"member_id": row.member_id, "loans": row.loans, "returns": 0, "late_returns": 0, "fines": 0.0}
+        for row in db_session.query(Transaction.member_id, func.count().label("loans")).filter(*new_loans).group_by(Transaction.member_id)
+    ], increments=("loans",))
+
+    # 2. Returns on whole days since the last processed day
+    returned = (
+        Transaction.status == "Returned",
+        Transaction.return_date > last_return_day,
+        Transaction.return_date <= yesterday,
+    )
+    days_on_loan = func.sum(_days_between(db_session, Transaction.return_date, Transaction.issue_date))
+    _add_to(db_session, BookUsage, [
+        {"book_id": row.book_id, "loans": 0, "returns": row.returns, "days_on_loan": int(row.days_on_loan or 0)}
+        for row in db_session.query(
+            Transaction.book_id, func.count().label("returns"), days_on_loan.label("days_on_loan")
+        ).filter(*returned).group_by(Transaction.book_id)
+    ], increments=("returns", "days_on_loan"))
+
+    late = func.sum(func.coalesce(Transaction.return_date > Transaction.due_date, False).cast(Integer))
+    _add_to(db_session, MemberActivity, [
+        {"member_id": row.member_id, "loans": 0, "returns": row.returns, "late_returns": int(row.late or 0), "fines": float(row.fines or 0.0)}
+        for row in db_session.query(
+            Transaction.member_id, func.count().label("returns"), late.label("late"),
+            func.sum(Transaction.fine_amount).label("fines")
+        ).filter(*returned).group_by(Transaction.member_id)
+    ], increments=("returns", "late_returns", "fines"))
+
+    latency = {}
+    days_late = _days_between(db_session, Transaction.return_date, Transaction.due_date).cast(Integer)
+    for row in db_session.query(days_late.label("days_late"), func.count().label("returns")).filter(*returned).group_by(days_late):
+        bucket = min(max(int(row.days_late), LATENCY_RANGE[0]), LATENCY_RANGE[1])
+        latency[bucket] = latency.get(bucket, 0) + row.returns
+    _add_to(db_session, ReturnLatency, [{"days_late": k, "returns": v} for k, v in latency.items()], increments=("returns",))
+
+    # 3. Move the watermarks and commit everything together
+    _set_state(db_session, "last_transaction_id", max_transaction_id)
+    _set_state(db_session, "last_return_day", max(last_return_day, yesterday).isoformat())
+    if _get_state(db_session, "first_day") is None:
+        first_day = db_session.query(func.min(Transaction.issue_date)).scalar() or datetime.now().date()
+        _set_state(db_session, "first_day", first_day.isoformat())
+    db_session.commit()
+
+    return {
+        "new_loans": sum(row["loans"] for row in daily_rows),
+        "returns": sum(latency.values()),
+        "elapsed_seconds": round(time.perf_counter() - started, 3),
+    }
+
+def rebuild_analytics(db_session) -> dict:
+    """Clears every aggregate and watermark, then refreshes from the full history."""
+    for table in AGGREGATE_TABLES:
+        db_session.execute(table.delete())
+    db_session.commit()
+    return refresh_analytics(db_session)
+
+# --- 3. Dashboard Queries (read only the aggregates) ---
+
+def top_books(db_session, days: int = 30, limit: int = 10) -> list:
+    """Most borrowed books over the last 'days' days."""
+    since = datetime.now().date() - timedelta(days=days)
+    loans = func.sum(DailyBookLoans.loans).label("loans")
+    rows = db_session.query(DailyBookLoans.book_id, loans).filter(DailyBookLoans.day >= since).group_by(
+        DailyBookLoans.book_id).order_by(desc(loans)).limit(limit).all()
+    titles = dict(db_session.query(Book.book_id, Book.title).filter(Book.book_id.in_([r.book_id for r in rows])))
+    return [{"book_id": r.book_id, "title": titles.get(r.book_id), "loans": r.loans} for r in rows]
+
+def loans_by_category(db_session, days: int = 30) -> list:
+    """Loan counts per category over the last 'days' days."""
+    since = datetime.now().date() - timedelta(days=days)
+    loans = func.sum(DailyBookLoans.loans).label("loans")
+    return [
+        {"category": r.category or "Unknown", "loans": r.loans}
+        for r in db_session.query(DailyBookLoans.category, loans).filter(DailyBookLoans.day >= since).group_by(
+            DailyBookLoans.category).order_by(desc(loans))
+    ]
+
+def daily_loan_trend(db_session, days: int = 30) -> list:
+    """Total loans per day over the last 'days' days."""
+    since = datetime.now().date() - timedelta(days=days)
+    return [
+        {"day": r.day.isoformat(), "loans": r.loans}
+        for r in db_session.query(DailyBookLoans.day, func.sum(DailyBookLoans.loans).label("loans")).filter(
+            DailyBookLoans.day >= since).group_by(DailyBookLoans.day).order_by(DailyBookLoans.day)
+    ]
+
+def copy_utilisation(db_session, limit: int = 10, lowest: bool = False) -> list:
+    """
+    Share of available copy-days each book spent on loan since analytics began
+    (returned loans only). 'lowest=True' lists the least used titles instead.
+    """
+    first_day = date.fromisoformat(_get_state(db_session, "first_day", datetime.now().date().isoformat()))
+    tracked_days = max(1, (datetime.now().date() - first_day).days)
+    ratio = (BookUsage.days_on_loan * 1.0 / (func.max(Book.total_copies, 1) if db_session.get_bind().dialect.name == "sqlite"
+             else func.greatest(Book.total_copies, 1)) / tracked_days).label("utilisation")
+    rows = db_session.query(BookUsage.book_id, Book.title, Book.total_copies, BookUsage.loans, ratio).join(
+        Book, Book.book_id == BookUsage.book_id).order_by(ratio if lowest else desc(ratio)).limit(limit)
+    return [
+        {"book_id": r.book_id, "title": r.title, "total_copies": r.total_copies, "loans": r.loans, "utilisation": round(r.utilisation, 4)}
+        for r in rows
+    ]
+
+def top_borrowers(db_session, limit: int = 10) -> list:
+    """Members with the most loans."""
+    rows = db_session.query(
+        MemberActivity.member_id, MemberActivity.loans, MemberActivity.late_returns, MemberActivity.fines,
+        Member.first_name, Member.last_name
+    ).join(Member, Member.member_id == MemberActivity.member_id).order_by(desc(MemberActivity.loans)).limit(limit)
+    return [
+        {"member_id": r.member_id, "member_name": f"{r.first_name} {r.last_name}", "loans": r.loans,
+         "late_returns": r.late_returns, "fines": round(r.fines, 2)}
+        for r in rows
+    ]
+
+def return_latency_distribution(db_session) -> dict:
+    """Histogram of days returned relative to the due date, plus on-time share and median."""
+    buckets = {r.days_late: r.returns for r in db_session.query(ReturnLatency).order_by(ReturnLatency.days_late)}
+    total = sum(buckets.values())
+    median, running = None, 0
+    for days_late, count in buckets.items():
+        running += count
+        if median is None and running * 2 >= total:
+            median = days_late
+    on_time = sum(count for days_late, count in buckets.items() if days_late <= 0)
+    return {
+        "buckets": buckets,
+        "total_returns": total,
+        "on_time_ratio": round(on_time / total, 4) if total else None,
+        "median_days_late": median,
+    }
+
+if __name__ == "__main__":
+    # Usage: python analytics.py refresh | rebuild | report
+    initialize_analytics()
+    db = SessionLocal()
+    command = sys.argv[1] if len(sys.argv) > 1 else "report"
+    if command == "refresh":
+        print(f"Analytics refreshed: {refresh_analytics(db)}")
+    elif command == "rebuild":
+        print(f"Analytics rebuilt: {rebuild_analytics(db)}")
+    else:
+        print(json.dumps({
+            "top_books": top_books(db),
+            "loans_by_category": loans_by_category(db),
+            "copy_utilisation": copy_utilisation(db),
+            "top_borrowers": top_borrowers(db),
+            "return_latency": return_latency_distribution(db),
+        }, indent=4, default=str))
+    db.close()
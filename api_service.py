@@ -1,9 +1,440 @@
 import requests
+from requests.adapters import HTTPAdapter
 import json
+import os
+import random
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from instrumentation import metrics, timed
 
 # --- 1. Google Books API Service ---
 
 GOOGLE_BOOKS_API_URL = "https://www.googleapis.com/books/v1/volumes"
+GOOGLE_BOOKS_API_KEY = os.environ.get("GOOGLE_BOOKS_API_KEY")
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+class TokenBucket:
+    """Client-side rate limiter: allows 'rate' requests per second with bursts up to 'capacity'."""
+
+    def __init__(self, rate: float, capacity: int = None):
+        self.rate = rate
+        self.capacity = capacity or max(1, int(rate))
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Blocks until a token is available, then consumes it."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait_for = (1 - self.tokens) / self.rate
+            time.sleep(wait_for)
+
+class GoogleBooksClient:
+    """
+    Shared HTTP client for Google Books and cover image downloads.
+
+    Uses one pooled keep-alive session, explicit connect/read timeouts,
+    jittered exponential backoff on 429/5xx (honouring Retry-After) and a
+    token bucket so bulk imports stay within the API quota.
+    """
+
+    def __init__(self, requests_per_second: float = 10.0, burst: int = 20, pool_size: int = 32,
+                 connect_timeout: float = 3.05, read_timeout: float = 10.0,
+                 max_retries: int = 5, backoff_base: float = 0.5, backoff_max: float = 30.0):
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.rate_limiter = TokenBucket(requests_per_second, burst)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def get(self, url: str, params: dict = None, rate_limited: bool = True) -> requests.Response:
+        """
+        Performs a GET with retries. Returns the final response (callers still
+        call raise_for_status) or raises the last network error.
+        """
+        for attempt in range(self.max_retries + 1):
+            if rate_limited:
+                self.rate_limiter.acquire()
+            started = time.perf_counter()
+            try:
+                response = self.session.get(url, params=params, timeout=self.timeout)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                metrics.increment("google_books_requests", status="error")
+                if attempt == self.max_retries:
+                    raise
+                time.sleep(self._backoff_delay(attempt))
+                continue
+            metrics.observe("google_books_http", (time.perf_counter() - started) * 1000)
+            metrics.increment("google_books_requests", status=response.status_code)
+
+            if response.status_code not in RETRY_STATUS_CODES or attempt == self.max_retries:
+                return response
+            delay = self._retry_after(response)
+            if delay is None:
+                delay = self._backoff_delay(attempt)
+            response.close()
+            time.sleep(delay)
+
+    def _backoff_delay(self, attempt: int) -> float:
+        # "Full jitter": a random delay up to the exponential ceiling
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def _retry_after(self, response):
+        value = response.headers.get("Retry-After")
+        if not value:
+            return None
+        try:
+            return min(self.backoff_max, float(value))
+        except ValueError:
+            pass
+        try:
+            return min(self.backoff_max, max(0.0, parsedate_to_datetime(value).timestamp() - time.time()))
+        except (TypeError, ValueError):
+            return None
+
+books_client = GoogleBooksClient()
+
+# --- 2. Metadata Providers ---
+# Where volume searches go. LMS_METADATA_PROVIDER selects one at start-up:
+# "google" (default), "fixture" / "fixture:volumes.json" for the offline
+# stand-in corpus, or the URL of a Google Books-compatible server such as
+# google_books_standin.py.
+
+FIXTURE_SYNTHETIC_COUNT = 10000 # Synthetic volumes in the default "fixture" corpus
+
+class GoogleBooksProvider:
+    """
+    Volume searches against Google Books, or any server speaking its API at 'url'.
+    'url' and 'client' default to GOOGLE_BOOKS_API_URL and books_client.
+    """
+
+    def __init__(self, url: str = None, client: GoogleBooksClient = None, api_key: str = GOOGLE_BOOKS_API_KEY):
+        self.url = url
+        self.client = client
+        self.api_key = api_key
+
+    def search(self, query: str, max_results: int = None) -> dict:
+        """Runs a volumes query and returns the decoded response. HTTP errors are raised as requests exceptions."""
+        params = {"q": query}
+        if max_results:
+            params["maxResults"] = max_results
+        if self.api_key:
+            params["key"] = self.api_key
+        response = (self.client or books_client).get(self.url or GOOGLE_BOOKS_API_URL, params=params)
+        response.raise_for_status() # Raise an exception for bad status codes (4xx or 5xx)
+        return response.json()
+
+class FixtureProvider(GoogleBooksProvider):
+    """
+    Serves a google_books_standin.FixtureCorpus in-process. Requests still go
+    through a GoogleBooksClient (rate limit, retries, Retry-After), whose
+    session answers from the corpus instead of the network.
+    """
+
+    URL = "http://google-books.standin/books/v1/volumes"
+
+    def __init__(self, corpus=None, client: GoogleBooksClient = None):
+        from google_books_standin import FixtureCorpus, StandInAdapter
+        self.corpus = corpus or FixtureCorpus.synthetic(FIXTURE_SYNTHETIC_COUNT)
+        client = client or GoogleBooksClient(requests_per_second=1000, burst=1000)
+        client.session.mount("http://google-books.standin/", StandInAdapter(self.corpus))
+        super().__init__(self.URL, client, api_key=None)
+
+def provider_from_spec(spec: str):
+    """Builds the provider named by an LMS_METADATA_PROVIDER value."""
+    spec = (spec or "google").strip()
+    if spec == "google":
+        return GoogleBooksProvider()
+    if spec == "fixture":
+        return FixtureProvider()
+    if spec.startswith("fixture:"):
+        from google_books_standin import FixtureCorpus
+        return FixtureProvider(FixtureCorpus.from_file(spec[len("fixture:"):]))
+    if spec.startswith(("http://", "https://")):
+        return GoogleBooksProvider(url=spec)
+    raise ValueError(f"Unknown metadata provider '{spec}'. Use google, fixture, fixture:PATH or a URL.")
+
+metadata_provider = provider_from_spec(os.environ.get("LMS_METADATA_PROVIDER"))
+
+# --- 3. ISBN Metadata Cache ---
+
+ISBN_CACHE_PATH = os.environ.get("LMS_ISBN_CACHE_PATH", "isbn_cache.db") # ":memory:" for a per-process cache
+CACHE_TTL_SECONDS = 30 * 24 * 3600 # Found volumes rarely change
+NEGATIVE_CACHE_TTL_SECONDS = 24 * 3600 # Re-check "No book found" ISBNs daily
+CACHE_MISS = object()
+
+def normalize_isbn(isbn: str) -> str:
+    """Strips hyphens and whitespace so '978-0-345-39180-3' and '9780345391803' share a cache entry."""
+    return isbn.replace("-", "").replace(" ", "").strip().upper()
+
+class MetadataCache:
+    """
+    Two-tier cache of Google Books 'volumeInfo' records keyed by ISBN.
+
+    The first tier is an in-process LRU; the second is a SQLite file that
+    survives restarts. A cached value of None records that the API found no
+    book for that ISBN (a negative entry), which has its own shorter TTL.
+    """
+
+    def __init__(self, path: str = ISBN_CACHE_PATH, memory_size: int = 2048, disk_size: int = 200000,
+                 ttl: int = CACHE_TTL_SECONDS, negative_ttl: int = NEGATIVE_CACHE_TTL_SECONDS):
+        self.path = path
+        self.memory_size = memory_size
+        self.disk_size = disk_size
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "negative_hits": 0, "misses": 0, "evictions": 0}
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        self._disk_rows = 0 # Row count of isbn_cache, counted once on open and kept up to date by set() and eviction
+
+    def _connection(self):
+        # Opened lazily so importing this module never touches the disk
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS isbn_cache ("
+                "isbn TEXT PRIMARY KEY, volume_info TEXT, expires_at REAL NOT NULL, last_used REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS ix_isbn_cache_last_used ON isbn_cache (last_used)")
+            self._conn.commit()
+            self._disk_rows = self._conn.execute("SELECT COUNT(*) FROM isbn_cache").fetchone()[0]
+        return self._conn
+
+    def get(self, isbn: str):
+        """Returns the cached volumeInfo dict, None for a negative entry, or CACHE_MISS."""
+        key = normalize_isbn(isbn)
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    self._record_hit("memory_hits", value)
+                    return value
+                del self._memory[key]
+
+            conn = self._connection()
+            row = conn.execute("SELECT volume_info, expires_at FROM isbn_cache WHERE isbn = ?", (key,)).fetchone()
+            if row is None or row[1] <= now:
+                self.stats["misses"] += 1
+                metrics.increment("isbn_cache_lookups", result="miss")
+                return CACHE_MISS
+
+            value = json.loads(row[0]) if row[0] is not None else None
+            conn.execute("UPDATE isbn_cache SET last_used = ? WHERE isbn = ?", (now, key))
+            conn.commit()
+            self._remember(key, value, row[1])
+            self._record_hit("disk_hits", value)
+            return value
+
+    def set(self, isbn: str, volume_info, ttl: int = None):
+        """Stores a volumeInfo dict, or None to record that no book exists for the ISBN."""
+        key = normalize_isbn(isbn)
+        if ttl is None:
+            ttl = self.ttl if volume_info is not None else self.negative_ttl
+        now = time.time()
+        expires_at = now + ttl
+        payload = json.dumps(volume_info) if volume_info is not None else None
+        with self._lock:
+            self._remember(key, volume_info, expires_at)
+            conn = self._connection()
+            inserted = conn.execute(
+                "INSERT OR IGNORE INTO isbn_cache (isbn, volume_info, expires_at, last_used) VALUES (?, ?, ?, ?)",
+                (key, payload, expires_at, now)
+            ).rowcount
+            if inserted:
+                self._disk_rows += 1
+                self._evict_disk(conn)
+            else:
+                conn.execute(
+                    "UPDATE isbn_cache SET volume_info = ?, expires_at = ?, last_used = ? WHERE isbn = ?",
+                    (payload, expires_at, now, key)
+                )
+            conn.commit()
+
+    def clear(self):
+        """Drops every entry from both tiers."""
+        with self._lock:
+            self._memory.clear()
+            conn = self._connection()
+            conn.execute("DELETE FROM isbn_cache")
+            conn.commit()
+            self._disk_rows = 0
+
+    def close(self):
+        """Closes the SQLite file; it is reopened on next use."""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _record_hit(self, tier: str, value):
+        self.stats[tier] += 1
+        if value is None:
+            self.stats["negative_hits"] += 1
+        metrics.increment("isbn_cache_lookups", result=tier.replace("_hits", ""))
+
+    def _remember(self, key, value, expires_at):
+        self._memory[key] = (value, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def _evict_disk(self, conn):
+        overflow = self._disk_rows - self.disk_size
+        if overflow > 0:
+            # Expired rows go first, then the least recently used
+            evicted = conn.execute(
+                "DELETE FROM isbn_cache WHERE isbn IN ("
+                "SELECT isbn FROM isbn_cache ORDER BY expires_at > ?, last_used LIMIT ?)",
+                (time.time(), overflow)
+            ).rowcount
+            self._disk_rows -= evicted
+            self.stats["evictions"] += evicted
+
+metadata_cache = MetadataCache()
+
+@contextmanager
+def use_metadata_provider(provider, cache: MetadataCache = None):
+    """Temporarily routes lookups to 'provider' (and 'cache', if given), e.g. a FixtureProvider in tests and benchmarks."""
+    global metadata_provider, metadata_cache
+    saved = metadata_provider, metadata_cache
+    metadata_provider = provider
+    metadata_cache = cache or metadata_cache
+    try:
+        yield provider
+    finally:
+        metadata_provider, metadata_cache = saved
+
+@timed
+def fetch_volume_info(isbn: str):
+    """
+    Returns the Google Books 'volumeInfo' for an ISBN, or None if no book was found.
+    Results (including "not found") are served from and stored in metadata_cache.
+    Network errors are raised as requests exceptions and are never cached.
+    """
+    cached = metadata_cache.get(isbn)
+    if cached is not CACHE_MISS:
+        return cached
+
+    # The query uses 'isbn:...' to search specifically by ISBN
+    data = metadata_provider.search(f"isbn:{normalize_isbn(isbn)}")
+    volume_info = data["items"][0]["volumeInfo"] if data.get("totalItems", 0) > 0 and data.get("items") else None
+    metadata_cache.set(isbn, volume_info)
+    return volume_info
+
+def parse_volume_info(isbn: str, item) -> dict:
+    """Converts a Google Books 'volumeInfo' (or None) into the lookup result dict used by the Book model."""
+    if item is None:
+        return {"success": False, "message": f"No book found for ISBN: {isbn}"}
+
+    # Simple data extraction (needs more robust parsing in a final product)
+    return {
+        "isbn": isbn,
+        "title": item.get("title", "N/A"),
+        "author": ", ".join(item.get("authors", ["N/A"])),
+        "publisher": item.get("publisher", "N/A"),
+        "publication_year": int(item.get("publishedDate", "0000")[:4]),
+        "category": ", ".join(item.get("categories", ["General"])),
+        "description": item.get("description", "No description available."),
+        "cover_image_url": item.get("imageLinks", {}).get("thumbnail"),
+        "success": True
+    }
+
+# --- 4. Batched ISBN Lookup ---
+
+ISBNS_PER_QUERY = 10 # Google Books returns at most 40 items per page; leave room for editions
+
+def _volume_isbns(volume_info: dict) -> set:
+    return {
+        normalize_isbn(identifier.get("identifier", ""))
+        for identifier in volume_info.get("industryIdentifiers", [])
+        if identifier.get("type") in ("ISBN_10", "ISBN_13")
+    }
+
+@timed
+def fetch_volume_infos(isbns: list) -> dict:
+    """
+    Fetches several ISBNs with one 'isbn:A OR isbn:B' query and splits the
+    response back per ISBN using each volume's industryIdentifiers.
+    ISBNs that the combined query did not return are looked up individually,
+    so a truncated page is never mistaken for "No book found".
+    """
+    data = metadata_provider.search(" OR ".join(f"isbn:{isbn}" for isbn in isbns), max_results=40)
+
+    wanted = set(isbns)
+    found = {}
+    for item in data.get("items", []):
+        volume_info = item.get("volumeInfo", {})
+        for isbn in _volume_isbns(volume_info) & wanted:
+            found.setdefault(isbn, volume_info)
+
+    for isbn, volume_info in found.items():
+        metadata_cache.set(isbn, volume_info)
+    for isbn in wanted - found.keys():
+        found[isbn] = fetch_volume_info(isbn)
+    return found
+
+@timed
+def lookup_books_by_isbns(isbns, max_workers: int = 8, isbns_per_query: int = ISBNS_PER_QUERY) -> dict:
+    """
+    Looks up many ISBNs at once.
+
+    Input is normalised and de-duplicated, cached entries are served
+    directly, and the remainder is fetched in combined queries across a
+    bounded worker pool. Returns {normalised_isbn: result}, where each
+    result has the same shape as lookup_book_by_isbn's.
+    """
+    normalized = list(dict.fromkeys(normalize_isbn(isbn) for isbn in isbns if isbn and isbn.strip()))
+    results = {}
+    to_fetch = []
+    for isbn in normalized:
+        cached = metadata_cache.get(isbn)
+        if cached is CACHE_MISS:
+            to_fetch.append(isbn)
+        else:
+            results[isbn] = parse_volume_info(isbn, cached)
+
+    groups = [to_fetch[i:i + isbns_per_query] for i in range(0, len(to_fetch), isbns_per_query)]
+    if groups:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(groups))) as executor:
+            futures = {executor.submit(fetch_volume_infos, group): group for group in groups}
+            for future in as_completed(futures):
+                group = futures[future]
+                try:
+                    for isbn, volume_info in future.result().items():
+                        results[isbn] = parse_volume_info(isbn, volume_info)
+                except requests.exceptions.RequestException as e:
+                    for isbn in group:
+                        results[isbn] = {"success": False, "message": f"API Request Failed: {e}"}
+                except Exception as e:
+                    for isbn in group:
+                        results[isbn] = {"success": False, "message": f"An unexpected error occurred: {e}"}
+
+    return {isbn: results[isbn] for isbn in normalized}
+
+# --- 5. Notifications and Single Lookups ---
 
 def send_sms_notification(to_phone: str, message_body: str) -> bool:
     """
@@ -30,6 +461,7 @@ def send_email_notification(to_email: str, subject: str, content: str) -> bool:
     # In a real app: return SendGridAPIClient.send(...)
     return True
 
+@timed
 def lookup_book_by_isbn(isbn: str) -> dict:
     """
     Looks up book details using the Google Books API based on the ISBN.
@@ -38,7 +470,9 @@ def lookup_book_by_isbn(isbn: str) -> dict:
     1. API key management (if required for higher limits).
     2. Error handling (404, rate limits, network errors).
     3. Data parsing and normalization to fit the Book model.
-    4. Caching of results to avoid repeated API calls.
+    
+    Results are cached (see fetch_volume_info), so repeated lookups of the
+    same ISBN do not call the API again.
     
     For this placeholder, we will simulate a successful API call for a known ISBN
     and return a structured dictionary.
@@ -61,35 +495,8 @@ def lookup_book_by_isbn(isbn: str) -> dict:
         print("Simulated API success.")
         return simulated_data
     
-    # Placeholder for actual API call
     try:
-        # The query uses 'isbn:...' to search specifically by ISBN
-        params = {"q": f"isbn:{isbn}"}
-        response = requests.get(GOOGLE_BOOKS_API_URL, params=params)
-        response.raise_for_status() # Raise an exception for bad status codes (4xx or 5xx)
-        
-        data = response.json()
-        
-        if data.get("totalItems", 0) > 0:
-            # Extract the first result
-            item = data["items"][0]["volumeInfo"]
-            
-            # Simple data extraction (needs more robust parsing in a final product)
-            book_details = {
-                "isbn": isbn,
-                "title": item.get("title", "N/A"),
-                "author": ", ".join(item.get("authors", ["N/A"])),
-                "publisher": item.get("publisher", "N/A"),
-                "publication_year": int(item.get("publishedDate", "0000")[:4]),
-                "category": ", ".join(item.get("categories", ["General"])),
-                "description": item.get("description", "No description available."),
-                "cover_image_url": item.get("imageLinks", {}).get("thumbnail"),
-                "success": True
-            }
-            return book_details
-        else:
-            return {"success": False, "message": f"No book found for ISBN: {isbn}"}
-
+        return parse_volume_info(isbn, fetch_volume_info(isbn))
     except requests.exceptions.RequestException as e:
         print(f"API Request Error: {e}")
         return {"success": False, "message": f"API Request Failed: {e}"}
@@ -0,0 +1,663 @@
+import http.client
+import json
+import math
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from urllib.parse import urlparse
+import sqlalchemy
+from sqlalchemy import bindparam, func
+from sqlalchemy.orm import sessionmaker
+from lms_models import (
+    Base, Book, Member, Transaction, BookReview, SQLITE_PROFILES, create_lms_engine, issue_book, return_book,
+    calculate_fine, reconcile_dashboard_counters, get_dashboard_stats, get_overdue_transactions,
+    send_due_date_reminders, get_all_books,
+)
+from notifications import NotificationDispatcher, StubTransport
+from google_books_standin import FixtureCorpus, STANDIN_CATEGORIES, synthetic_isbn
+
+# --- 1. Benchmark Database Helpers ---
+
+def create_benchmark_database(path: str = None, profile: str = None):
+    """Creates a throwaway SQLite database with the LMS schema. Returns (engine, Session, path)."""
+    if path is None:
+        handle, path = tempfile.mkstemp(prefix="lms_bench_", suffix=".db")
+        os.close(handle)
+    bench_engine = create_lms_engine(f"sqlite:///{path}", profile)
+    Base.metadata.create_all(bind=bench_engine)
+    return bench_engine, sessionmaker(bind=bench_engine), path
+
+def remove_benchmark_database(bench_engine, path: str):
+    bench_engine.dispose()
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+# --- 2. Concurrency Stress Test ---
+
+def stress_issue_book(threads: int = 8, copies: int = 25, attempts_per_thread: int = 50, return_every: int = 3) -> dict:
+    """
+    Hammers issue_book/return_book for one title from many threads at once,
+    each with its own session (like separate circulation desks). Every
+    third successful issue is returned again to keep copies cycling.
+
+    Checks that no copy is ever oversold: available copies must end up
+    equal to total copies minus loans still open, and never go negative.
+    """
+    bench_engine, Session, path = create_benchmark_database()
+    setup = Session()
+    book = Book(isbn="STRESS", title="Stress Test", total_copies=copies, available_copies=copies)
+    setup.add(book)
+    setup.add_all(Member(membership_number=f"S{i}", first_name="Desk", last_name=str(i)) for i in range(threads))
+    setup.commit()
+    book_id = book.book_id
+    setup.close()
+
+    counts = {"issued": 0, "out_of_stock": 0, "returned": 0, "errors": 0}
+    lock = threading.Lock()
+    start_gate = threading.Barrier(threads)
+
+    def desk(member_id):
+        db = Session()
+        start_gate.wait()
+        try:
+            for attempt in range(attempts_per_thread):
+                try:
+                    result = issue_book(db, member_id, book_id)
+                    key = "issued" if result["success"] else "out_of_stock"
+                    if result["success"] and attempt % return_every == 0:
+                        if return_book(db, result["transaction_id"])["success"]:
+                            with lock:
+                                counts["returned"] += 1
+                except Exception as e:
+                    key = "errors"
+                    print(f"  Desk {member_id} error: {e}")
+                with lock:
+                    counts[key] += 1
+        finally:
+            db.close()
+
+    started = time.perf_counter()
+    workers = [threading.Thread(target=desk, args=(i + 1,)) for i in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+
+    check = Session()
+    available = check.query(Book.available_copies).filter(Book.book_id == book_id).scalar()
+    open_loans = check.query(func.count(Transaction.transaction_id)).filter(
+        Transaction.book_id == book_id, Transaction.status == "Issued").scalar()
+    check.close()
+    remove_benchmark_database(bench_engine, path)
+
+    return dict(
+        counts,
+        threads=threads,
+        copies=copies,
+        available_copies=available,
+        open_loans=open_loans,
+        oversold=available < 0 or available + open_loans != copies,
+        elapsed_seconds=round(elapsed, 3),
+        operations_per_sec=round((counts["issued"] + counts["out_of_stock"] + counts["returned"]) / elapsed, 1),
+    )
+
+# --- 3. SQLite Profile Comparison ---
+
+def bench_commit_profiles(cycles: int = 500, profiles: tuple = None) -> dict:
+    """
+    Times a commit-heavy workload (issue_book followed by return_book, two
+    commits per cycle) under each SQLite profile. Returns {profile: stats}.
+    """
+    results = {}
+    for profile in profiles or tuple(SQLITE_PROFILES):
+        bench_engine, Session, path = create_benchmark_database(profile=profile)
+        db = Session()
+        book = Book(isbn="PROFILE", title="Profile Test", total_copies=1, available_copies=1)
+        db.add_all([book, Member(membership_number="P1", first_name="Bench", last_name="Mark")])
+        db.commit()
+
+        started = time.perf_counter()
+        for _ in range(cycles):
+            transaction_id = issue_book(db, 1, book.book_id)["transaction_id"]
+            return_book(db, transaction_id)
+        elapsed = time.perf_counter() - started
+
+        db.close()
+        remove_benchmark_database(bench_engine, path)
+        results[profile] = {
+            "cycles": cycles,
+            "elapsed_seconds": round(elapsed, 3),
+            "commits_per_sec": round(2 * cycles / elapsed, 1),
+        }
+    return results
+
+# --- 4. HTTP Service Load Test ---
+
+LOAD_TEST_MIX = {"stats": 3, "overdue": 1, "issue_return": 6} # Relative weights of each request kind
+
+def _percentile(sorted_values: list, pct: float) -> float:
+    if not sorted_values:
+        return None
+    return sorted_values[max(0, math.ceil(pct / 100 * len(sorted_values)) - 1)]
+
+def _start_local_service(books: int = 200, copies: int = 5, members: int = 50):
+    """Runs http_service on a throwaway seeded database in a background thread. Returns (base_url, stop)."""
+    import asyncio
+    from http_service import LMSService, start_server
+
+    bench_engine, Session, path = create_benchmark_database()
+    setup = Session()
+    setup.bulk_insert_mappings(Book, [
+        {"isbn": f"LOAD{i}", "title": f"Load Test {i}", "total_copies": copies, "available_copies": copies} for i in range(books)
+    ])
+    setup.bulk_insert_mappings(Member, [
+        {"membership_number": f"L{i}", "first_name": "Desk", "last_name": str(i)} for i in range(members)
+    ])
+    setup.commit()
+    setup.close()
+
+    def get_session():
+        db = Session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    service = LMSService(get_session=get_session)
+    loop = asyncio.new_event_loop()
+    server = loop.run_until_complete(start_server(service, "127.0.0.1", 0))
+    thread = threading.Thread(target=loop.run_forever, name="load-test-server", daemon=True)
+    thread.start()
+
+    async def close_connections():
+        server.close()
+        tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stop():
+        asyncio.run_coroutine_threadsafe(close_connections(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+        service.shutdown()
+        remove_benchmark_database(bench_engine, path)
+
+    return f"http://127.0.0.1:{server.sockets[0].getsockname()[1]}", stop
+
+def load_test_http(url: str = None, rates: tuple = (25, 50, 100, 200), duration: float = 5.0,
+                   mix: dict = None, workers: int = 64, books: int = 200, members: int = 50) -> dict:
+    """
+    Open-loop load test of the HTTP service at each request rate in 'rates'.
+
+    Requests are started on a fixed schedule whatever the response times, and
+    latency is measured from the scheduled start, so a stalled server shows up
+    in p99 rather than silently lowering the rate. Without 'url' a local
+    service is started on a seeded throwaway database.
+    Returns {rate: {"sent", "errors", "achieved_rps", "p50_ms", "p99_ms", "max_ms", "by_kind"}}.
+    """
+    stop = None
+    if url is None:
+        url, stop = _start_local_service(members=members, books=books)
+    target = urlparse(url)
+    kinds, weights = zip(*(mix or LOAD_TEST_MIX).items())
+    local = threading.local()
+
+    def request(method, path, body=None):
+        if not hasattr(local, "conn"):
+            local.conn = http.client.HTTPConnection(target.hostname, target.port, timeout=30)
+        payload = json.dumps(body).encode() if body is not None else None
+        try:
+            local.conn.request(method, path, body=payload, headers={"Content-Type": "application/json"})
+            response = local.conn.getresponse()
+            data = json.loads(response.read() or b"{}")
+        except (http.client.HTTPException, OSError):
+            local.conn.close()
+            del local.conn
+            raise
+        return response.status, data
+
+    def run_one(kind, scheduled):
+        ok = True
+        try:
+            if kind == "stats":
+                ok = request("GET", "/stats")[0] == 200
+            elif kind == "overdue":
+                ok = request("GET", "/loans/overdue")[0] == 200
+            elif kind == "lookup":
+                ok = request("GET", "/books/lookup/9780345391803")[0] == 200
+            else:
+                status, data = request("POST", "/loans", {"member_id": random.randint(1, members), "book_id": random.randint(1, books)})
+                if status == 201:
+                    ok = request("POST", f"/loans/{data['transaction_id']}/return")[0] == 200
+                else:
+                    ok = status == 409 # Out of stock is a valid answer
+        except Exception:
+            ok = False
+        return kind, ok, time.perf_counter() - scheduled
+
+    results = {}
+    try:
+        for rate in rates:
+            count = int(rate * duration)
+            futures = []
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                started = time.perf_counter()
+                for i in range(count):
+                    scheduled = started + i / rate
+                    delay = scheduled - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                    futures.append(executor.submit(run_one, random.choices(kinds, weights)[0], scheduled))
+                outcomes = [future.result() for future in futures]
+            elapsed = time.perf_counter() - started
+
+            latencies = sorted(latency for _, _, latency in outcomes)
+            by_kind = {}
+            for kind in kinds:
+                kind_latencies = sorted(latency for k, _, latency in outcomes if k == kind)
+                by_kind[kind] = {
+                    "count": len(kind_latencies),
+                    "p50_ms": round(_percentile(kind_latencies, 50) * 1000, 2) if kind_latencies else None,
+                    "p99_ms": round(_percentile(kind_latencies, 99) * 1000, 2) if kind_latencies else None,
+                }
+            results[rate] = {
+                "sent": count,
+                "errors": sum(1 for _, ok, _ in outcomes if not ok),
+                "achieved_rps": round(count / elapsed, 1),
+                "p50_ms": round(_percentile(latencies, 50) * 1000, 2),
+                "p99_ms": round(_percentile(latencies, 99) * 1000, 2),
+                "max_ms": round(latencies[-1] * 1000, 2),
+                "by_kind": by_kind,
+            }
+            print(f"[{rate} req/s] p50 {results[rate]['p50_ms']} ms, p99 {results[rate]['p99_ms']} ms, errors {results[rate]['errors']}")
+    finally:
+        if stop:
+            stop()
+    return results
+
+# --- 5. Benchmark Suite ---
+# Times the hot paths on synthetic data at several scales and writes the
+# results as JSON, so runs from different commits can be diffed.
+
+SUITE_SCALES = {"1k": 1000, "100k": 100000, "1m": 1000000} # Transactions per dataset
+MEMBERSHIP_MIX = {"Standard": 70, "Student": 20, "Premium": 10}
+RATING_WEIGHTS = (5, 10, 20, 35, 30) # Ratings 1..5
+INSERT_CHUNK = 20000
+
+def _dataset_shape(transactions: int) -> dict:
+    """Default dataset proportions for a given number of transactions."""
+    return {
+        "books": max(50, transactions // 10),
+        "members": max(20, transactions // 20),
+        "transactions": transactions,
+        "reviews": transactions // 10,
+    }
+
+def _insert_chunked(db_session, table, rows: list):
+    for start in range(0, len(rows), INSERT_CHUNK):
+        db_session.execute(table.insert(), rows[start:start + INSERT_CHUNK])
+
+def _loan_outcome(rng, age_days: int, loan_days: int):
+    """
+    Decides how a loan issued 'age_days' ago ended up: returns (still_open, return_delay_days).
+    Loans inside their loan period are open; after that the chance a loan is
+    still out decays over the following months, giving a long overdue tail.
+    Returned loans are mostly early or on time, with a smaller late tail.
+    """
+    if age_days < loan_days:
+        return True, None
+    if rng.random() < 0.25 * math.exp(-(age_days - loan_days) / 30) + 0.01:
+        return True, None
+    roll = rng.random()
+    if roll < 0.7:
+        delay = -rng.randint(0, loan_days - 1)
+    elif roll < 0.9:
+        delay = rng.randint(1, 7)
+    else:
+        delay = rng.randint(8, 60)
+    return False, min(delay, age_days - loan_days)
+
+def generate_dataset(db_session, books: int = 1000, members: int = 500, transactions: int = 10000,
+                     reviews: int = 1000, loan_days: int = 14, history_days: int = 365, seed: int = 42) -> dict:
+    """
+    Fills an empty database with synthetic books, members, loans and reviews.
+
+    Book popularity is skewed (a few titles get most of the loans), issue
+    dates are spread over the last 'history_days' and open loans never
+    exceed a book's copies. Dashboard counters are reconciled at the end.
+    Returns the number of rows written per table plus the open/overdue loan counts.
+    """
+    rng = random.Random(seed)
+    today = datetime.now().date()
+
+    copies = [rng.choice((1, 1, 2, 2, 3, 5)) for _ in range(books)]
+    available = list(copies)
+    _insert_chunked(db_session, Book.__table__, [
+        {
+            "book_id": i + 1, "isbn": f"978{i:010d}", "title": f"Synthetic Title {i}",
+            "author": f"Author {i % max(1, books // 5)}", "publisher": "Benchmark Press",
+            "publication_year": 1950 + i % 75, "category": STANDIN_CATEGORIES[i % len(STANDIN_CATEGORIES)],
+            "total_copies": copies[i], "available_copies": copies[i],
+        }
+        for i in range(books)
+    ])
+
+    types, type_weights = zip(*MEMBERSHIP_MIX.items())
+    member_types = rng.choices(types, type_weights, k=members)
+    _insert_chunked(db_session, Member.__table__, [
+        {
+            "member_id": i + 1, "membership_number": f"SYN{i:07d}", "first_name": f"Member{i}", "last_name": "Synthetic",
+            "email": f"member{i}@example.com", "phone": f"+1555{i:07d}", "join_date": today - timedelta(days=rng.randint(0, 3650)),
+            "membership_type": member_types[i], "status": "Active",
+        }
+        for i in range(members)
+    ])
+
+    loans = []
+    open_loans = overdue_loans = 0
+    for i in range(transactions):
+        book = min(books - 1, int(books * rng.random() ** 2)) # Quadratic skew towards low book ids
+        member = rng.randrange(members)
+        age = rng.randint(0, history_days)
+        issue_date = today - timedelta(days=age)
+        due_date = issue_date + timedelta(days=loan_days)
+        still_open, delay = _loan_outcome(rng, age, loan_days)
+        if still_open and available[book] == 0:
+            still_open, delay = False, min(0, age - loan_days)
+        loan = {
+            "transaction_id": i + 1, "member_id": member + 1, "book_id": book + 1,
+            "issue_date": issue_date, "due_date": due_date, "return_date": None, "fine_amount": 0.0, "status": "Issued",
+        }
+        if still_open:
+            available[book] -= 1
+            open_loans += 1
+            overdue_loans += due_date < today
+        else:
+            loan["return_date"] = due_date + timedelta(days=delay)
+            loan["fine_amount"] = calculate_fine(delay, member_types[member]) if delay > 0 else 0.0
+            loan["status"] = "Returned"
+        loans.append(loan)
+        if len(loans) == INSERT_CHUNK:
+            _insert_chunked(db_session, Transaction.__table__, loans)
+            loans = []
+    _insert_chunked(db_session, Transaction.__table__, loans)
+
+    db_session.execute(
+        Book.__table__.update().where(Book.book_id == bindparam("b_id")).values(available_copies=bindparam("available")),
+        [{"b_id": i + 1, "available": available[i]} for i in range(books) if available[i] != copies[i]]
+    )
+
+    _insert_chunked(db_session, BookReview.__table__, [
+        {
+            "book_id": min(books - 1, int(books * rng.random() ** 2)) + 1, "member_id": rng.randrange(members) + 1,
+            "rating": rng.choices(range(1, 6), RATING_WEIGHTS)[0], "review_text": "Synthetic review.",
+            "review_date": today - timedelta(days=rng.randint(0, history_days)),
+        }
+        for _ in range(reviews)
+    ])
+    db_session.commit()
+    reconcile_dashboard_counters(db_session)
+
+    return {"books": books, "members": members, "transactions": transactions, "reviews": reviews,
+            "open_loans": open_loans, "overdue_loans": overdue_loans}
+
+@contextmanager
+def offline_metadata(corpus, client=None):
+    """
+    Routes lms_api_service lookups to an in-process FixtureProvider over
+    'corpus', with a fresh throwaway metadata cache. Yields the provider.
+    """
+    import lms_api_service
+    cache_dir = tempfile.mkdtemp(prefix="lms_bench_cache_")
+    cache = lms_api_service.MetadataCache(os.path.join(cache_dir, "isbn_cache.db"))
+    provider = lms_api_service.FixtureProvider(corpus, client)
+    try:
+        with lms_api_service.use_metadata_provider(provider, cache):
+            yield provider
+    finally:
+        cache.close()
+        provider.client.session.close()
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+def bench_bulk_lookups(isbns: int = 2000, missing_fraction: float = 0.05, latency: float = 0.02, error_rate: float = 0.0,
+                       throttle_rate: float = 0.0, max_workers: int = 8, seed: int = 0) -> dict:
+    """
+    Times lookup_books_by_isbns against the offline stand-in: once cold (every
+    ISBN fetched) and once warm (all served from the metadata cache).
+    'missing_fraction' of the ISBNs are unknown to the corpus, exercising the
+    per-ISBN fallback and negative caching; error_rate/throttle_rate exercise retries.
+    """
+    import lms_api_service
+    corpus = FixtureCorpus.synthetic(isbns, latency=latency, error_rate=error_rate, throttle_rate=throttle_rate,
+                                     retry_after=0.05, seed=seed)
+    wanted = [synthetic_isbn(n) for n in range(isbns)] + [synthetic_isbn(isbns + n) for n in range(int(isbns * missing_fraction))]
+    random.Random(seed).shuffle(wanted)
+    client = lms_api_service.GoogleBooksClient(requests_per_second=1000, burst=1000, backoff_base=0.05)
+
+    phases = {}
+    with offline_metadata(corpus, client):
+        for phase in ("cold", "warm"):
+            requests_before = corpus.stats["requests"]
+            started = time.perf_counter()
+            results = lms_api_service.lookup_books_by_isbns(wanted, max_workers=max_workers)
+            elapsed = time.perf_counter() - started
+            phases[phase] = {
+                "elapsed_seconds": round(elapsed, 3),
+                "isbns_per_sec": round(len(wanted) / elapsed, 1),
+                "found": sum(1 for result in results.values() if result.get("success")),
+                "not_found": sum(1 for result in results.values() if "No book found" in result.get("message", "")),
+                "failed": sum(1 for result in results.values() if "Failed" in result.get("message", "")),
+                "requests": corpus.stats["requests"] - requests_before,
+            }
+        cache_stats = dict(lms_api_service.metadata_cache.stats)
+    return {"isbns": len(wanted), "latency_ms": latency * 1000, "error_rate": error_rate, "throttle_rate": throttle_rate,
+            "stand_in": dict(corpus.stats), "cache": cache_stats, "phases": phases}
+
+def _time_calls(func, repeat: int) -> dict:
+    """Calls func() 'repeat' times and summarises the wall-clock times in milliseconds."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return {
+        "runs": repeat,
+        "mean_ms": round(sum(timings) / repeat, 3),
+        "p50_ms": round(_percentile(timings, 50), 3),
+        "p95_ms": round(_percentile(timings, 95), 3),
+        "min_ms": round(timings[0], 3),
+        "max_ms": round(timings[-1], 3),
+    }
+
+def bench_scale(transactions: int, repeat: int = None, populate_isbns: int = 500,
+                lookup_latency: float = 0.02, seed: int = 42) -> dict:
+    """
+    Builds a synthetic dataset with 'transactions' loans and times each hot
+    path against it. Returns {"dataset": ..., "setup_seconds": ..., "operations": {name: stats}}.
+    Heavy whole-table calls run fewer times than the single-row ones.
+    """
+    import populate_dp
+    rng = random.Random(seed)
+    repeat = repeat or 50
+    few = max(3, repeat // 10)
+
+    bench_engine, Session, path = create_benchmark_database()
+    db = Session()
+    try:
+        started = time.perf_counter()
+        shape = _dataset_shape(transactions)
+        dataset = generate_dataset(db, seed=seed, **shape)
+        setup_seconds = time.perf_counter() - started
+        print(f"[{transactions}] dataset ready in {setup_seconds:.1f}s: {dataset}")
+
+        operations = {}
+        issued = []
+
+        def issue_one():
+            result = issue_book(db, rng.randint(1, shape["members"]), rng.randint(1, shape["books"]))
+            if result["success"]:
+                issued.append(result["transaction_id"])
+
+        operations["issue_book"] = _time_calls(issue_one, repeat)
+        if issued:
+            operations["return_book"] = _time_calls(lambda: return_book(db, issued.pop()), len(issued))
+        operations["get_dashboard_stats"] = _time_calls(lambda: get_dashboard_stats(db), repeat)
+        operations["get_overdue_transactions"] = _time_calls(lambda: get_overdue_transactions(db), few)
+        operations["get_all_books"] = _time_calls(lambda: (get_all_books(db), db.expunge_all()), few)
+
+        dispatcher = NotificationDispatcher(StubTransport(), linger=0)
+        jobs = []
+        operations["send_due_date_reminders"] = _time_calls(lambda: jobs.append(send_due_date_reminders(db, dispatcher)), few)
+        delivery_started = time.perf_counter()
+        for job in jobs:
+            job.wait()
+        operations["send_due_date_reminders"]["messages_per_run"] = jobs[0].total if jobs else 0
+        operations["send_due_date_reminders"]["delivery_seconds"] = round(time.perf_counter() - delivery_started, 3)
+        dispatcher.shutdown()
+
+        handle, isbn_path = tempfile.mkstemp(prefix="lms_bench_isbns_", suffix=".txt")
+        with os.fdopen(handle, "w") as f:
+            f.write("\n".join(synthetic_isbn(i) for i in range(populate_isbns)))
+        try:
+            with offline_metadata(FixtureCorpus.synthetic(populate_isbns, latency=lookup_latency)):
+                summary = populate_dp.populate_books_from_list(isbn_path, progress_every=max(1, populate_isbns), session=db)
+            operations["populate_books_from_list"] = dict(
+                summary, isbns=populate_isbns, lookup_latency_ms=lookup_latency * 1000,
+                isbns_per_sec=round(populate_isbns / summary["elapsed_seconds"], 1) if summary["elapsed_seconds"] else None,
+            )
+        finally:
+            os.remove(isbn_path)
+    finally:
+        db.close()
+        remove_benchmark_database(bench_engine, path)
+
+    return {"dataset": dataset, "setup_seconds": round(setup_seconds, 2), "operations": operations}
+
+# --- 6. Start-up Profile ---
+
+STARTUP_IMPORTS = ("main", "lms_models", "lms_api_service", "PIL.ImageTk") # What the GUI imports before vs. after its first window
+
+def _import_times(module: str) -> dict:
+    """Runs 'import module' under python -X importtime in a fresh interpreter. Returns {module: cumulative microseconds}."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], capture_output=True, text=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__)))
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed: {result.stderr.strip().splitlines()[-1]}")
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        if name == "site":
+            times = {} # Everything so far was the interpreter's own start-up
+            continue
+        times[name] = int(cumulative)
+    return times
+
+def profile_startup(runs: int = 5, top: int = 10) -> dict:
+    """
+    Import-time profile of the GUI start-up path. For each module in
+    STARTUP_IMPORTS, the best of 'runs' cold imports (in fresh interpreters)
+    is reported with the slowest modules it pulls in; importing main is what
+    delays the first window. With a display available, `main.py
+    --profile-startup` is also run for the window/database/dashboard milestones.
+    """
+    report = {"imports_ms": {}, "slowest_in_main": {}}
+    for module in STARTUP_IMPORTS:
+        samples = [_import_times(module) for _ in range(runs)]
+        best = min(samples, key=lambda times: times.get(module, 0))
+        report["imports_ms"][module] = round(best.get(module, 0) / 1000, 1)
+        if module == "main":
+            slowest = sorted(((us, name) for name, us in best.items() if name != module), reverse=True)[:top]
+            report["slowest_in_main"] = {name: round(us / 1000, 1) for us, name in slowest}
+
+    if os.environ.get("DISPLAY") or sys.platform in ("win32", "darwin"):
+        milestones = []
+        for _ in range(runs):
+            result = subprocess.run([sys.executable, "main.py", "--profile-startup"], capture_output=True, text=True,
+                                    cwd=os.path.dirname(os.path.abspath(__file__)), timeout=120)
+            lines = [line for line in result.stdout.splitlines() if line.startswith("{")]
+            if lines:
+                milestones.append(json.loads(lines[-1])["startup_ms"])
+        if milestones:
+            report["startup_ms"] = {name: min(run[name] for run in milestones if name in run) for name in milestones[0]}
+    else:
+        report["startup_ms"] = None # No display to open the window on
+    return report
+
+def _run_metadata() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.realpath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "commit": commit,
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "sqlalchemy": sqlalchemy.__version__,
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+    }
+
+def run_benchmark_suite(scales=("1k",), output: str = None, **options) -> dict:
+    """
+    Runs bench_scale for each scale (a SUITE_SCALES name or a transaction count)
+    and returns {"meta": ..., "results": {scale: ...}}, also written to 'output' as JSON if given.
+    """
+    report = {"meta": _run_metadata(), "results": {}}
+    for scale in scales:
+        transactions = SUITE_SCALES.get(str(scale).lower()) or int(scale)
+        report["results"][str(scale)] = bench_scale(transactions, **options)
+    if output:
+        with open(output, "w") as f:
+            json.dump(report, f, indent=4)
+        print(f"Benchmark results written to {output}")
+    return report
+
+if __name__ == "__main__":
+    # Usage: python benchmarks.py stress [threads] | profiles [cycles] | http [url] | lookups [isbns] [error_rate] [throttle_rate] | startup [runs] | suite [scale ...] [output.json]
+    if len(sys.argv) > 1 and sys.argv[1] == "stress":
+        result = stress_issue_book(threads=int(sys.argv[2]) if len(sys.argv) > 2 else 8)
+        print(json.dumps(result, indent=4))
+        sys.exit(1 if result["oversold"] or result["errors"] else 0)
+    if len(sys.argv) > 1 and sys.argv[1] == "profiles":
+        print(json.dumps(bench_commit_profiles(int(sys.argv[2]) if len(sys.argv) > 2 else 500), indent=4))
+        sys.exit(0)
+    if len(sys.argv) > 1 and sys.argv[1] == "http":
+        print(json.dumps(load_test_http(sys.argv[2] if len(sys.argv) > 2 else None), indent=4))
+        sys.exit(0)
+    if len(sys.argv) > 1 and sys.argv[1] == "lookups":
+        print(json.dumps(bench_bulk_lookups(
+            int(sys.argv[2]) if len(sys.argv) > 2 else 2000,
+            error_rate=float(sys.argv[3]) if len(sys.argv) > 3 else 0.0,
+            throttle_rate=float(sys.argv[4]) if len(sys.argv) > 4 else 0.0,
+        ), indent=4))
+        sys.exit(0)
+    if len(sys.argv) > 1 and sys.argv[1] == "startup":
+        report = {"meta": _run_metadata(), "results": profile_startup(int(sys.argv[2]) if len(sys.argv) > 2 else 5)}
+        print(json.dumps(report, indent=4))
+        sys.exit(0)
+    if len(sys.argv) > 1 and sys.argv[1] == "suite":
+        args = sys.argv[2:]
+        output = next((arg for arg in args if arg.endswith(".json")), None)
+        report = run_benchmark_suite([arg for arg in args if arg != output] or ["1k"], output)
+        if not output:
+            print(json.dumps(report, indent=4))
+        sys.exit(0)
+    print("Usage: python benchmarks.py stress [threads] | profiles [cycles] | http [url] | lookups [isbns] [error_rate] [throttle_rate] | startup [runs] | suite [scale ...] [output.json]")
@@ -0,0 +1,253 @@
+import csv
+import json
+import sys
+import time
+from datetime import date
+from itertools import islice
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import DataError, IntegrityError
+from lms_models import SessionLocal, Book, Member, Transaction, reconcile_dashboard_counters, serve_hold_queues, notify_holds_ready
+
+# --- 1. Entity Definitions ---
+
+# entity name -> (model, natural key used for upserts, imported/exported columns)
+ENTITIES = {
+    "books": (Book, "isbn", [
+        "book_id", "isbn", "title", "author", "publisher", "publication_year", "category",
+        "description", "cover_image_url", "total_copies", "available_copies", "shelf_location"
+    ]),
+    "members": (Member, "membership_number", [
+        "member_id", "membership_number", "first_name", "last_name", "email", "phone",
+        "join_date", "membership_type", "status"
+    ]),
+    "transactions": (Transaction, "transaction_id", [
+        "transaction_id", "member_id", "book_id", "issue_date", "due_date", "return_date",
+        "fine_amount", "status"
+    ]),
+}
+
+MAX_REPORTED_ERRORS = 100
+
+class RejectedRow(ValueError):
+    """An input row that cannot be imported."""
+
+def _file_format(path: str) -> str:
+    if path.endswith(".csv"):
+        return "csv"
+    if path.endswith(".jsonl") or path.endswith(".ndjson"):
+        return "jsonl"
+    raise ValueError(f"Unsupported file type for '{path}'. Use .csv or .jsonl")
+
+def chunked(iterable, size: int):
+    """Yields lists of up to 'size' items without materialising the whole iterable."""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+# --- 2. Streaming Import ---
+
+def read_records(path: str):
+    """
+    Yields (line_number, record) from a CSV or JSONL file one row at a time.
+    'record' is a dict, or a RejectedRow if the line could not be parsed.
+    """
+    file_format = _file_format(path)
+    with open(path, newline="", encoding="utf-8") as f:
+        if file_format == "csv":
+            # Line 1 is the header
+            for line_number, record in enumerate(csv.DictReader(f), start=2):
+                yield line_number, record
+        else:
+            for line_number, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError as e:
+                    yield line_number, RejectedRow(f"Invalid JSON: {e}")
+                    continue
+                yield line_number, record if isinstance(record, dict) else RejectedRow("Expected a JSON object")
+
+def _convert_record(model, columns: list, record: dict) -> dict:
+    """Converts one input record to column values of the right types, or raises RejectedRow."""
+    table = model.__table__
+    row = {}
+    for name in columns:
+        value = record.get(name)
+        if value is None or value == "":
+            continue
+        python_type = table.c[name].type.python_type
+        try:
+            if python_type is date:
+                row[name] = value if isinstance(value, date) else date.fromisoformat(str(value)[:10])
+            elif python_type is int:
+                row[name] = int(value)
+            elif python_type is float:
+                row[name] = float(value)
+            else:
+                row[name] = str(value)
+        except (TypeError, ValueError):
+            raise RejectedRow(f"Invalid value for '{name}': {value!r}")
+
+    for column in table.c:
+        if not column.nullable and not column.primary_key and column.default is None and column.name not in row:
+            raise RejectedRow(f"Missing required field '{column.name}'")
+    return row
+
+def _upsert_rows(db_session, model, key: str, rows: list):
+    """Inserts rows, updating existing ones that share the natural key, using multi-row executemany."""
+    table = model.__table__
+    primary_key = table.primary_key.columns.values()[0].name
+    dialect = db_session.get_bind().dialect.name
+
+    # executemany needs every row in a statement to carry the same columns
+    groups = {}
+    for row in rows:
+        groups.setdefault(tuple(sorted(row)), []).append(row)
+
+    for row_columns, group in groups.items():
+        if dialect in ("sqlite", "postgresql"):
+            insert = sqlite.insert if dialect == "sqlite" else postgresql.insert
+            statement = insert(table)
+            updates = {name: statement.excluded[name] for name in row_columns if name not in (key, primary_key)}
+            if updates and key in row_columns:
+                statement = statement.on_conflict_do_update(index_elements=[key], set_=updates)
+            db_session.execute(statement, group)
+        else:
+            # Portable path: look up which keys exist, then bulk insert/update
+            keys = [row[key] for row in group if key in row]
+            existing = dict(db_session.query(getattr(model, key), getattr(model, primary_key)).filter(getattr(model, key).in_(keys)))
+            new_rows = [row for row in group if row.get(key) not in existing]
+            changed_rows = [dict(row, **{primary_key: existing[row[key]]}) for row in group if row.get(key) in existing]
+            db_session.bulk_insert_mappings(model, new_rows)
+            db_session.bulk_update_mappings(model, changed_rows)
+
+def import_records(db_session, entity: str, path: str, chunk_size: int = 1000, rejects_path: str = None) -> dict:
+    """
+    Streams a CSV/JSONL file into the books, members or transactions table.
+
+    Rows are converted and upserted in chunks of 'chunk_size' (books on isbn,
+    members on membership_number, transactions on transaction_id), one
+    transaction per chunk. Rows that fail validation or a constraint are
+    skipped and reported; with 'rejects_path' they are also written out as JSONL.
+    Shelf copies of imported books with Waiting holds go to those holds first.
+    """
+    model, key, columns = ENTITIES[entity]
+    summary = {"read": 0, "imported": 0, "rejected": 0, "errors": []}
+    promoted = []
+    rejects = open(rejects_path, "w", encoding="utf-8") if rejects_path else None
+    started = time.perf_counter()
+
+    def reject(line_number, record, reason):
+        summary["rejected"] += 1
+        if len(summary["errors"]) < MAX_REPORTED_ERRORS:
+            summary["errors"].append({"line": line_number, "error": reason})
+        if rejects:
+            rejects.write(json.dumps({"line": line_number, "error": reason, "record": record}, default=str) + "\n")
+
+    def upsert(rows):
+        _upsert_rows(db_session, model, key, rows)
+        if model is Book:
+            isbns = [row["isbn"] for row in rows if "isbn" in row]
+            book_ids = [book_id for (book_id,) in db_session.query(Book.book_id).filter(Book.isbn.in_(isbns))]
+            return serve_hold_queues(db_session, book_ids)
+        return []
+
+    try:
+        for chunk in chunked(read_records(path), chunk_size):
+            rows = []
+            for line_number, record in chunk:
+                summary["read"] += 1
+                try:
+                    if isinstance(record, RejectedRow):
+                        raise record
+                    rows.append((line_number, record, _convert_record(model, columns, record)))
+                except RejectedRow as e:
+                    reject(line_number, record, str(e))
+
+            try:
+                ready = upsert([row for _, _, row in rows])
+                db_session.commit()
+                promoted.extend(ready)
+                summary["imported"] += len(rows)
+            except (IntegrityError, DataError):
+                # Something in this chunk broke a constraint or a column type; retry row by row to find it
+                db_session.rollback()
+                for line_number, record, row in rows:
+                    try:
+                        ready = upsert([row])
+                        db_session.commit()
+                        promoted.extend(ready)
+                        summary["imported"] += 1
+                    except IntegrityError as e:
+                        db_session.rollback()
+                        reject(line_number, record, f"Constraint violation: {e.orig}")
+                    except DataError as e:
+                        db_session.rollback()
+                        reject(line_number, record, f"Invalid data: {e.orig}")
+
+            elapsed = time.perf_counter() - started
+            print(f"[{summary['read']}] rows read, {summary['imported']} imported, {summary['rejected']} rejected ({summary['read'] / elapsed:.0f} rows/sec)")
+    finally:
+        if rejects:
+            rejects.close()
+
+    # Bulk upserts bypass the per-row counter updates, so rebuild them once
+    reconcile_dashboard_counters(db_session)
+    if promoted:
+        notify_holds_ready(db_session, promoted)
+    summary["holds_ready"] = len(promoted)
+    summary["elapsed_seconds"] = round(time.perf_counter() - started, 2)
+    return summary
+
+# --- 3. Streaming Export ---
+
+def _serialize(value):
+    return value.isoformat() if isinstance(value, date) else value
+
+def export_records(db_session, entity: str, path: str, batch_size: int = 1000) -> int:
+    """
+    Streams a table to CSV or JSONL with a server-side cursor, fetching
+    'batch_size' rows at a time so memory stays flat. Returns the row count.
+    """
+    model, _, columns = ENTITIES[entity]
+    file_format = _file_format(path)
+    primary_key = model.__table__.primary_key.columns.values()[0]
+    query = db_session.query(*[getattr(model, name) for name in columns]).order_by(primary_key).yield_per(batch_size)
+
+    count = 0
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        if file_format == "csv":
+            writer = csv.writer(f)
+            writer.writerow(columns)
+            for row in query:
+                writer.writerow([_serialize(value) for value in row])
+                count += 1
+        else:
+            for row in query:
+                f.write(json.dumps(dict(zip(columns, (_serialize(value) for value in row)))) + "\n")
+                count += 1
+    return count
+
+if __name__ == "__main__":
+    # Usage: python catalogue_io.py import|export books|members|transactions FILE.csv|FILE.jsonl [chunk_size]
+    if len(sys.argv) < 4 or sys.argv[1] not in ("import", "export") or sys.argv[2] not in ENTITIES:
+        print("Usage: python catalogue_io.py import|export books|members|transactions FILE.csv|FILE.jsonl [chunk_size]")
+        sys.exit(1)
+
+    command, entity, path = sys.argv[1:4]
+    size = int(sys.argv[4]) if len(sys.argv) > 4 else 1000
+    db = SessionLocal()
+    try:
+        if command == "import":
+            result = import_records(db, entity, path, chunk_size=size, rejects_path=f"{path}.rejects.jsonl")
+            print(json.dumps(result, indent=4))
+        else:
+            started = time.perf_counter()
+            exported = export_records(db, entity, path, batch_size=size)
+            print(f"Exported {exported} {entity} to {path} in {time.perf_counter() - started:.1f}s")
+    finally:
+        db.close()
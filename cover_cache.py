@@ -0,0 +1,193 @@
+import hashlib
+import io
+import os
+import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from PIL import Image
+from lms_api_service import books_client
+
+# --- 1. On-Disk Thumbnail Store ---
+
+COVER_CACHE_DIR = "cover_cache"
+COVER_CACHE_MAX_BYTES = 200 * 1024 * 1024
+THUMBNAIL_SIZE = (100, 150) # Matches the cover area in the Book Details panel
+EVICTION_BATCH = 64 # Least recently used keys read per round while over budget
+
+class CoverCache:
+    """
+    Content-addressed store of pre-resized cover thumbnails.
+
+    Thumbnails are saved once as <sha256>.jpg, so identical covers behind
+    different URLs share a file. A small SQLite index maps each cover URL
+    (or ISBN) to its digest. Once the store exceeds 'max_bytes', the least
+    recently used keys are dropped, and so are files no key refers to.
+    """
+
+    def __init__(self, directory: str = COVER_CACHE_DIR, max_bytes: int = COVER_CACHE_MAX_BYTES, size: tuple = THUMBNAIL_SIZE):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.size = size
+        self.stats = {"hits": 0, "misses": 0, "evicted_bytes": 0}
+        self._lock = threading.Lock()
+        self._conn = None
+        self._total_bytes = 0 # Size of the thumbnails keys refer to, summed once on open and kept up to date
+
+    def _connection(self):
+        if self._conn is None:
+            os.makedirs(self.directory, exist_ok=True)
+            self._conn = sqlite3.connect(os.path.join(self.directory, "index.db"), check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS covers ("
+                "key TEXT PRIMARY KEY, digest TEXT NOT NULL, size INTEGER NOT NULL, last_used REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS ix_covers_last_used ON covers (last_used)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS ix_covers_digest ON covers (digest)")
+            self._conn.commit()
+            self._total_bytes = self._conn.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM (SELECT DISTINCT digest, size FROM covers)"
+            ).fetchone()[0]
+        return self._conn
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.directory, f"{digest}.jpg")
+
+    def get(self, key: str):
+        """Returns the cached thumbnail bytes for a URL/ISBN, or None."""
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute("SELECT digest, size FROM covers WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                try:
+                    with open(self._path(row[0]), "rb") as f:
+                        data = f.read()
+                except FileNotFoundError:
+                    conn.execute("DELETE FROM covers WHERE key = ?", (key,))
+                    self._release(conn, *row)
+                    conn.commit()
+                else:
+                    conn.execute("UPDATE covers SET last_used = ? WHERE key = ?", (time.time(), key))
+                    conn.commit()
+                    self.stats["hits"] += 1
+                    return data
+            self.stats["misses"] += 1
+            return None
+
+    def put(self, key: str, data: bytes):
+        """Stores already-resized thumbnail bytes under a URL/ISBN."""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._path(digest)
+        with self._lock:
+            conn = self._connection()
+            if not os.path.exists(path):
+                tmp_path = f"{path}.tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, path) # Atomic, so readers never see a partial file
+            if not self._referenced(conn, digest):
+                self._total_bytes += len(data)
+            previous = conn.execute("SELECT digest, size FROM covers WHERE key = ?", (key,)).fetchone()
+            conn.execute(
+                "INSERT OR REPLACE INTO covers (key, digest, size, last_used) VALUES (?, ?, ?, ?)",
+                (key, digest, len(data), time.time())
+            )
+            if previous is not None and previous[0] != digest:
+                self._release(conn, *previous) # The key's old cover may now be unused
+            if self._total_bytes > self.max_bytes:
+                self._evict(conn)
+            conn.commit()
+
+    def _referenced(self, conn, digest: str) -> bool:
+        return conn.execute("SELECT 1 FROM covers WHERE digest = ? LIMIT 1", (digest,)).fetchone() is not None
+
+    def _release(self, conn, digest: str, size: int) -> bool:
+        """Deletes a thumbnail file once no key refers to it. Returns True if it did."""
+        if self._referenced(conn, digest):
+            return False
+        try:
+            os.remove(self._path(digest))
+        except FileNotFoundError:
+            pass
+        self._total_bytes -= size
+        return True
+
+    def _evict(self, conn):
+        # Oldest keys first, a small batch at a time off ix_covers_last_used, until back under budget
+        while self._total_bytes > self.max_bytes:
+            candidates = conn.execute(
+                "SELECT key, digest, size FROM covers ORDER BY last_used LIMIT ?", (EVICTION_BATCH,)
+            ).fetchall()
+            if not candidates:
+                break
+            for key, digest, size in candidates:
+                conn.execute("DELETE FROM covers WHERE key = ?", (key,))
+                if self._release(conn, digest, size):
+                    self.stats["evicted_bytes"] += size
+                if self._total_bytes <= self.max_bytes:
+                    break
+
+    def fetch_thumbnail(self, url: str, key: str = None) -> bytes:
+        """Returns thumbnail bytes for a cover URL, downloading and resizing it on a cache miss."""
+        key = key or url
+        data = self.get(key)
+        if data is not None:
+            return data
+
+        # Covers go through the shared pooled client but don't count against the API quota
+        response = books_client.get(url, rate_limited=False)
+        response.raise_for_status()
+        image = Image.open(io.BytesIO(response.content))
+        image.thumbnail(self.size)
+        buffer = io.BytesIO()
+        image.convert("RGB").save(buffer, format="JPEG", quality=85)
+        data = buffer.getvalue()
+        self.put(key, data)
+        return data
+
+    def prefetch(self, urls, max_workers: int = 8) -> dict:
+        """Warms thumbnails for many cover URLs in parallel. Returns counts of fetched/cached/failed."""
+        summary = {"fetched": 0, "cached": 0, "failed": 0}
+        urls = list(dict.fromkeys(url for url in urls if url))
+        with self._lock:
+            conn = self._connection()
+            known = {row[0] for row in conn.execute("SELECT key FROM covers")}
+        to_fetch = [url for url in urls if url not in known]
+        summary["cached"] = len(urls) - len(to_fetch)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(self.fetch_thumbnail, url): url for url in to_fetch}
+            for done, future in enumerate(as_completed(futures), start=1):
+                try:
+                    future.result()
+                    summary["fetched"] += 1
+                except Exception as e:
+                    summary["failed"] += 1
+                    print(f"  FAILURE: {futures[future]}: {e}")
+                if done % 100 == 0:
+                    print(f"[{done}/{len(to_fetch)}] covers prefetched")
+        return summary
+
+cover_cache = CoverCache()
+
+# --- 2. Catalogue Prefetch Command ---
+
+def prefetch_catalogue_covers(max_workers: int = 8) -> dict:
+    """Warms the thumbnail cache for every book in the catalogue that has a cover URL."""
+    from lms_models import Book, run_in_session
+
+    urls = run_in_session(
+        lambda db: [row.cover_image_url for row in db.query(Book.cover_image_url).filter(Book.cover_image_url.isnot(None)).distinct()]
+    )
+    print(f"--- Prefetching {len(urls)} cover thumbnails ---")
+    summary = cover_cache.prefetch(urls, max_workers=max_workers)
+    print(f"--- Cover Prefetch Complete: {summary} ---")
+    return summary
+
+if __name__ == "__main__":
+    # Usage: python cover_cache.py prefetch [max_workers]
+    if len(sys.argv) > 1 and sys.argv[1] == "prefetch":
+        prefetch_catalogue_covers(int(sys.argv[2]) if len(sys.argv) > 2 else 8)
+    else:
+        print("Usage: python cover_cache.py prefetch [max_workers]")
@@ -0,0 +1,269 @@
+import json
+import random
+import sys
+import threading
+import time
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+
+# --- 1. Fixture Corpus ---
+# Answers Google Books volume queries ('isbn:A OR isbn:B', maxResults,
+# startIndex) from a fixed set of volumes, with optional latency, server
+# errors and 429 throttling, so lookups can run offline and repeatably.
+
+STANDIN_CATEGORIES = ("Fiction", "Science", "History", "Children", "Biography", "Travel", "Computing", "Poetry")
+DEFAULT_MAX_RESULTS = 10 # Google Books' default page size
+MAX_RESULTS_LIMIT = 40
+
+FIXTURE_VOLUMES = [
+    {
+        "title": "The Hitchhiker's Guide to the Galaxy",
+        "authors": ["Douglas Adams"],
+        "publisher": "Del Rey Books",
+        "publishedDate": "1995-09-27",
+        "categories": ["Science Fiction"],
+        "description": "Seconds before the Earth is demolished to make way for a galactic freeway, Arthur Dent is plucked off the planet by his friend Ford Prefect...",
+        "industryIdentifiers": [{"type": "ISBN_13", "identifier": "9780345391803"}, {"type": "ISBN_10", "identifier": "0345391802"}],
+        "imageLinks": {"thumbnail": "http://books.google.com/books/content?id=lX4tngEACAAJ&printsec=frontcover&img=1&zoom=1&source=gbs_api"},
+    },
+    {
+        "title": "The Da Vinci Code",
+        "authors": ["Dan Brown"],
+        "publisher": "Anchor",
+        "publishedDate": "2003",
+        "categories": ["Fiction"],
+        "description": "While in Paris, Harvard symbologist Robert Langdon is awakened by a phone call in the dead of the night.",
+        "industryIdentifiers": [{"type": "ISBN_13", "identifier": "9781400030636"}, {"type": "ISBN_10", "identifier": "1400030633"}],
+    },
+]
+
+def synthetic_isbn(n: int) -> str:
+    """The n-th ISBN of the synthetic range used by FixtureCorpus.synthetic."""
+    return f"979{n:010d}"
+
+def synthetic_volume(isbn: str) -> dict:
+    """A deterministic 'volumeInfo' record for an ISBN."""
+    digits = int(isbn[-6:]) if isbn[-6:].isdigit() else 0
+    return {
+        "title": f"Stand-in Volume {isbn}",
+        "authors": [f"Author {digits % 997}"],
+        "publisher": "Stand-in Press",
+        "publishedDate": f"{1950 + digits % 75}-01-01",
+        "categories": [STANDIN_CATEGORIES[digits % len(STANDIN_CATEGORIES)]],
+        "description": "Served by the local Google Books stand-in.",
+        "industryIdentifiers": [{"type": "ISBN_13", "identifier": isbn}],
+        "imageLinks": {"thumbnail": f"http://127.0.0.1/covers/{isbn}.jpg"},
+    }
+
+def _isbn_key(isbn: str) -> str:
+    return isbn.replace("-", "").replace(" ", "").strip().upper()
+
+class FixtureCorpus:
+    """
+    A set of volumes and the fault settings applied when serving them.
+
+    'latency' (seconds, plus up to 'jitter') is added to every request;
+    'error_rate' of requests get a 503 and 'throttle_rate' a 429 with
+    Retry-After 'retry_after'; above 'max_rps' requests per second every
+    request is throttled. Faults come from a seeded generator, so a run
+    with the same settings and request order is repeatable.
+    """
+
+    def __init__(self, volumes: list = None, latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0,
+                 throttle_rate: float = 0.0, retry_after: float = 1.0, max_rps: float = None, seed: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.max_rps = max_rps
+        self.stats = {"requests": 0, "ok": 0, "errors": 0, "throttled": 0, "volumes_served": 0}
+        self._volumes = {}
+        self._random = random.Random(seed)
+        self._window = (0, 0) # (second, requests seen in it) for max_rps
+        self._lock = threading.Lock()
+        self.add(FIXTURE_VOLUMES if volumes is None else volumes)
+
+    @classmethod
+    def synthetic(cls, count: int, start: int = 0, **faults):
+        """The built-in fixtures plus 'count' synthetic volumes (see synthetic_isbn)."""
+        corpus = cls(**faults)
+        corpus.add(synthetic_volume(synthetic_isbn(n)) for n in range(start, start + count))
+        return corpus
+
+    @classmethod
+    def from_file(cls, path: str, **faults):
+        """Loads volumes from a saved Google Books response ({"items": [...]}) or a list of volumeInfo records."""
+        with open(path) as f:
+            data = json.load(f)
+        items = data.get("items", []) if isinstance(data, dict) else data
+        return cls([item.get("volumeInfo", item) for item in items], **faults)
+
+    def save(self, path: str):
+        with open(path, "w") as f:
+            json.dump({"kind": "books#volumes", "items": [{"volumeInfo": v} for v in self.volumes()]}, f, indent=1)
+
+    def add(self, volumes):
+        with self._lock:
+            for volume in volumes:
+                for identifier in volume.get("industryIdentifiers", []):
+                    self._volumes[_isbn_key(identifier.get("identifier", ""))] = volume
+
+    def volumes(self) -> list:
+        return list({id(v): v for v in self._volumes.values()}.values())
+
+    def isbns(self) -> list:
+        return list(self._volumes)
+
+    def respond(self, params: dict):
+        """Answers one volumes query. 'params' maps names to values or lists of values. Returns (status, headers, body)."""
+        params = {name: value[-1] if isinstance(value, list) else value for name, value in params.items()}
+        with self._lock:
+            self.stats["requests"] += 1
+            second = int(time.monotonic())
+            seen = self._window[1] + 1 if self._window[0] == second else 1
+            self._window = (second, seen)
+            roll = self._random.random()
+            delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay:
+            time.sleep(delay)
+
+        if (self.max_rps and seen > self.max_rps) or roll < self.throttle_rate:
+            with self._lock:
+                self.stats["throttled"] += 1
+            error = {"error": {"code": 429, "message": "Rate Limit Exceeded", "errors": [{"reason": "rateLimitExceeded"}]}}
+            return 429, {"Retry-After": f"{self.retry_after:g}"}, error
+        if roll < self.throttle_rate + self.error_rate:
+            with self._lock:
+                self.stats["errors"] += 1
+            return 503, {}, {"error": {"code": 503, "message": "Service Unavailable"}}
+
+        terms = [term.strip() for term in params.get("q", "").split(" OR ")]
+        if not any(term.startswith("isbn:") for term in terms):
+            return 400, {}, {"error": {"code": 400, "message": "Only isbn: queries are supported by the stand-in"}}
+        matches = []
+        for term in terms:
+            volume = self._volumes.get(_isbn_key(term[5:])) if term.startswith("isbn:") else None
+            if volume is not None and all(volume is not m for m in matches):
+                matches.append(volume)
+        start = int(params.get("startIndex", 0))
+        page = matches[start:start + min(int(params.get("maxResults", DEFAULT_MAX_RESULTS)), MAX_RESULTS_LIMIT)]
+
+        with self._lock:
+            self.stats["ok"] += 1
+            self.stats["volumes_served"] += len(page)
+        body = {"kind": "books#volumes", "totalItems": len(matches)}
+        if page:
+            body["items"] = [
+                {"kind": "books#volume", "id": f"standin-{_isbn_key(v['industryIdentifiers'][0]['identifier'])}", "volumeInfo": v}
+                for v in page
+            ]
+        return 200, {}, body
+
+# --- 2. In-Process Transport ---
+
+class StandInAdapter(BaseAdapter):
+    """
+    A requests transport adapter that answers from a FixtureCorpus without
+    opening a socket. Mounted on a GoogleBooksClient's session, the client's
+    rate limiting, retries and Retry-After handling run exactly as they would
+    against the real API.
+    """
+
+    def __init__(self, corpus: FixtureCorpus):
+        super().__init__()
+        self.corpus = corpus
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        status, headers, body = self.corpus.respond(parse_qs(urlsplit(request.url).query))
+        response = requests.Response()
+        response.status_code = status
+        response.reason = HTTPStatus(status).phrase
+        response.headers = CaseInsensitiveDict(dict(headers, **{"Content-Type": "application/json; charset=UTF-8"}))
+        response._content = json.dumps(body).encode("utf-8")
+        response.encoding = "utf-8"
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+# --- 3. Stand-in Server ---
+
+class StandInServer:
+    """
+    Serves a FixtureCorpus over HTTP at http://host:port/books/v1/volumes, for
+    processes that cannot be handed an in-process provider (CI jobs, other
+    languages, load tests). Use as a context manager or call start()/stop().
+    """
+
+    def __init__(self, corpus: FixtureCorpus = None, host: str = "127.0.0.1", port: int = 0):
+        self.corpus = corpus or FixtureCorpus()
+        corpus = self.corpus
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1" # Keep-alive, like the real API
+
+            def do_GET(self):
+                url = urlsplit(self.path)
+                if url.path.rstrip("/") != "/books/v1/volumes":
+                    status, headers, body = 404, {}, {"error": {"code": 404, "message": "Not Found"}}
+                else:
+                    status, headers, body = corpus.respond(parse_qs(url.query))
+                payload = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=UTF-8")
+                self.send_header("Content-Length", str(len(payload)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://{host}:{self.server.server_address[1]}/books/v1/volumes"
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, name="google-books-stand-in", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+        if self._thread:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+if __name__ == "__main__":
+    # Usage: python google_books_standin.py [port] [synthetic_count] [latency] [error_rate] [throttle_rate]
+    args = sys.argv[1:]
+    corpus = FixtureCorpus.synthetic(
+        int(args[1]) if len(args) > 1 else 10000,
+        latency=float(args[2]) if len(args) > 2 else 0.0,
+        error_rate=float(args[3]) if len(args) > 3 else 0.0,
+        throttle_rate=float(args[4]) if len(args) > 4 else 0.0,
+    )
+    server = StandInServer(corpus, port=int(args[0]) if args else 8765)
+    print(f"Google Books stand-in serving {len(corpus.isbns())} ISBNs at {server.url}")
+    print(f"Point the LMS at it with LMS_METADATA_PROVIDER={server.url}")
+    try:
+        server.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server.server_close()
@@ -0,0 +1,318 @@
+import asyncio
+import json
+import os
+import re
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from http import HTTPStatus
+from urllib.parse import parse_qs
+from lms_models import engine, get_db, initialize_database, issue_book, return_book, add_book_to_db, get_dashboard_stats, get_overdue_transactions
+from lms_api_service import lookup_book_by_isbn
+from instrumentation import metrics
+
+# --- 1. Application ---
+# A plain ASGI application, so it runs under any ASGI server
+# (e.g. `uvicorn http_service:app --workers 1`) or the small built-in one below.
+
+DB_WORKERS = int(os.environ.get("LMS_HTTP_DB_WORKERS", 8)) # Keep at or below the engine's pool size
+LOOKUP_WORKERS = int(os.environ.get("LMS_HTTP_LOOKUP_WORKERS", 16))
+MAX_BODY_BYTES = 1024 * 1024
+LOAN_DAYS_RANGE = (1, 365) # Accepted 'loan_days' on issue; outside it a loan is overdue at once or never due
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+def _int_field(data: dict, name: str, default=None, bounds: tuple = None) -> int:
+    value = data.get(name, default)
+    if value is None:
+        raise HTTPError(400, f"Missing required field '{name}'")
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        raise HTTPError(400, f"Field '{name}' must be an integer")
+    if bounds is not None and not bounds[0] <= value <= bounds[1]:
+        raise HTTPError(400, f"Field '{name}' must be between {bounds[0]} and {bounds[1]}")
+    return value
+
+def _result_status(result: dict, success_status: int = 200) -> int:
+    """Maps a business function's {"success", "message"} result onto an HTTP status."""
+    if result.get("success"):
+        return success_status
+    return 404 if "not found" in result.get("message", "").lower() else 409
+
+def _add_book(db_session, book_data: dict) -> dict:
+    book = add_book_to_db(db_session, book_data)
+    return {
+        "success": True,
+        "message": f"Book '{book.title}' saved.",
+        "book_id": book.book_id,
+        "isbn": book.isbn,
+        "total_copies": book.total_copies,
+        "available_copies": book.available_copies,
+    }
+
+class LMSService:
+    """
+    JSON endpoints over the circulation functions in lms_models.
+
+    Every database call runs on a worker thread with its own session from
+    'get_session' (get_db by default), so sessions are per request and
+    connections come from the engine's pool. Google Books lookups run on a
+    separate pool, so a slow lookup never holds up issue/return calls.
+
+    SQLite allows one writer at a time and makes the others poll with
+    sleeps, so on SQLite write calls queue on an in-process lock instead.
+    """
+
+    def __init__(self, get_session=get_db, db_workers: int = DB_WORKERS, lookup_workers: int = LOOKUP_WORKERS, serialize_writes: bool = None):
+        self.get_session = get_session
+        if serialize_writes is None:
+            serialize_writes = engine.dialect.name == "sqlite"
+        self.write_lock = threading.Lock() if serialize_writes else None
+        self.db_pool = ThreadPoolExecutor(max_workers=db_workers, thread_name_prefix="http-db")
+        self.lookup_pool = ThreadPoolExecutor(max_workers=lookup_workers, thread_name_prefix="http-lookup")
+        self.routes = [
+            ("GET", re.compile(r"/health"), self.health),
+            ("GET", re.compile(r"/stats"), self.stats),
+            ("GET", re.compile(r"/metrics"), self.metrics_report),
+            ("GET", re.compile(r"/loans/overdue"), self.overdue),
+            ("POST", re.compile(r"/loans"), self.issue),
+            ("POST", re.compile(r"/loans/(?P<transaction_id>\d+)/return"), self.return_loan),
+            ("GET", re.compile(r"/books/lookup/(?P<isbn>[0-9Xx-]+)"), self.lookup),
+            ("POST", re.compile(r"/books"), self.add_book),
+        ]
+
+    def _in_session(self, func, write, *args, **kwargs):
+        sessions = self.get_session()
+        db = next(sessions)
+        try:
+            if write and self.write_lock:
+                with self.write_lock:
+                    return func(db, *args, **kwargs)
+            return func(db, *args, **kwargs)
+        finally:
+            sessions.close()
+
+    async def run_db(self, func, *args, write: bool = False, **kwargs):
+        """Runs func(db_session, *args, **kwargs) on the database pool with a fresh session."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.db_pool, partial(self._in_session, func, write, *args, **kwargs))
+
+    async def run_lookup(self, isbn: str) -> dict:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.lookup_pool, lookup_book_by_isbn, isbn)
+
+    def shutdown(self):
+        self.db_pool.shutdown(wait=True)
+        self.lookup_pool.shutdown(wait=True)
+
+    # --- Handlers: each returns (status, payload) ---
+
+    async def health(self, request):
+        return 200, {"status": "ok"}
+
+    async def stats(self, request):
+        return 200, await self.run_db(get_dashboard_stats)
+
+    async def metrics_report(self, request):
+        """Instrumentation in Prometheus text format, or JSON with ?format=json."""
+        if request["query"].get("format") == "json":
+            return 200, metrics.snapshot()
+        return 200, metrics.to_prometheus()
+
+    async def overdue(self, request):
+        return 200, await self.run_db(get_overdue_transactions)
+
+    async def issue(self, request):
+        body = request["json"]
+        result = await self.run_db(
+            issue_book, _int_field(body, "member_id"), _int_field(body, "book_id"), _int_field(body, "loan_days", 14, LOAN_DAYS_RANGE), write=True
+        )
+        return _result_status(result, 201), result
+
+    async def return_loan(self, request):
+        result = await self.run_db(return_book, int(request["params"]["transaction_id"]), write=True)
+        return _result_status(result), result
+
+    async def lookup(self, request):
+        result = await self.run_lookup(request["params"]["isbn"])
+        return _result_status(result), result
+
+    async def add_book(self, request):
+        """Adds a copy of a book. A body with only 'isbn' is looked up first; otherwise it must carry the book fields."""
+        body = request["json"]
+        if "isbn" not in body:
+            raise HTTPError(400, "Missing required field 'isbn'")
+        if "title" not in body:
+            looked_up = await self.run_lookup(str(body["isbn"]))
+            if not looked_up.get("success"):
+                return _result_status(looked_up), looked_up
+            body = dict(looked_up, **body)
+        book_data = {name: body.get(name) for name in (
+            "isbn", "title", "author", "publisher", "publication_year", "category", "description", "cover_image_url")}
+        result = await self.run_db(_add_book, book_data, write=True)
+        return 201, result
+
+    # --- ASGI entry point ---
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            while True:
+                message = await receive()
+                if message["type"] == "lifespan.startup":
+                    # Create tables and indexes before the first request (a no-op when the schema is current)
+                    try:
+                        await asyncio.get_running_loop().run_in_executor(self.db_pool, initialize_database)
+                    except Exception as e:
+                        await send({"type": "lifespan.startup.failed", "message": str(e)})
+                        return
+                    await send({"type": "lifespan.startup.complete"})
+                elif message["type"] == "lifespan.shutdown":
+                    self.shutdown()
+                    await send({"type": "lifespan.shutdown.complete"})
+                    return
+        if scope["type"] != "http":
+            return
+
+        try:
+            status, payload = await self._dispatch(scope, receive)
+        except HTTPError as e:
+            status, payload = e.status, {"success": False, "message": e.message}
+        except Exception as e:
+            print(f"HTTP handler error ({scope['method']} {scope['path']}): {e}")
+            status, payload = 500, {"success": False, "message": "Internal server error"}
+
+        if isinstance(payload, str):
+            body, content_type = payload.encode("utf-8"), b"text/plain; version=0.0.4; charset=utf-8"
+        else:
+            body, content_type = json.dumps(payload, default=str).encode("utf-8"), b"application/json"
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", content_type), (b"content-length", str(len(body)).encode())],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    async def _dispatch(self, scope, receive):
+        allowed = set()
+        for method, pattern, handler in self.routes:
+            match = pattern.fullmatch(scope["path"])
+            if not match:
+                continue
+            if method != scope["method"]:
+                allowed.add(method)
+                continue
+
+            raw = b""
+            while True:
+                message = await receive()
+                raw += message.get("body", b"")
+                if len(raw) > MAX_BODY_BYTES:
+                    raise HTTPError(413, "Request body too large")
+                if not message.get("more_body"):
+                    break
+            try:
+                data = json.loads(raw) if raw else {}
+            except ValueError:
+                raise HTTPError(400, "Request body is not valid JSON")
+            if not isinstance(data, dict):
+                raise HTTPError(400, "Request body must be a JSON object")
+
+            request = {
+                "params": match.groupdict(),
+                "query": {k: v[-1] for k, v in parse_qs(scope.get("query_string", b"").decode()).items()},
+                "json": data,
+            }
+            return await handler(request)
+
+        if allowed:
+            raise HTTPError(405, f"Method not allowed; use {', '.join(sorted(allowed))}")
+        raise HTTPError(404, "No such endpoint")
+
+app = LMSService()
+
+# --- 2. Built-in Server ---
+# Minimal HTTP/1.1 server (keep-alive, Content-Length bodies) for running the
+# service without installing an ASGI server.
+
+KEEP_ALIVE_SECONDS = 15
+
+async def _handle_connection(asgi_app, reader, writer):
+    peer = writer.get_extra_info("peername")
+    try:
+        while True:
+            request_line = await asyncio.wait_for(reader.readline(), KEEP_ALIVE_SECONDS)
+            if not request_line.strip():
+                break
+            method, target, version = request_line.decode("latin-1").split()
+            headers = []
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers.append((name.strip().lower().encode("latin-1"), value.strip().encode("latin-1")))
+            header_map = dict(headers)
+            length = int(header_map.get(b"content-length", 0))
+            if length > MAX_BODY_BYTES:
+                break
+            body = await reader.readexactly(length) if length else b""
+
+            path, _, query = target.partition("?")
+            scope = {
+                "type": "http", "asgi": {"version": "3.0"}, "http_version": version.partition("/")[2],
+                "method": method.upper(), "path": path, "query_string": query.encode("latin-1"),
+                "headers": headers, "client": peer,
+            }
+            response = {"status": 500, "headers": [], "body": b""}
+
+            async def receive():
+                return {"type": "http.request", "body": body, "more_body": False}
+
+            async def send(message):
+                if message["type"] == "http.response.start":
+                    response["status"] = message["status"]
+                    response["headers"] = message.get("headers", [])
+                elif message["type"] == "http.response.body":
+                    response["body"] += message.get("body", b"")
+
+            await asgi_app(scope, receive, send)
+
+            keep_alive = version == "HTTP/1.1" and header_map.get(b"connection", b"").lower() != b"close"
+            status = response["status"]
+            head = [f"HTTP/1.1 {status} {HTTPStatus(status).phrase}".encode("latin-1")]
+            head += [name + b": " + value for name, value in response["headers"]]
+            head.append(b"connection: " + (b"keep-alive" if keep_alive else b"close"))
+            writer.write(b"\r\n".join(head) + b"\r\n\r\n" + response["body"])
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (asyncio.IncompleteReadError, asyncio.TimeoutError, asyncio.CancelledError, ConnectionError, ValueError):
+        pass # Client went away, sent garbage, idled out, or the server is shutting down
+    finally:
+        writer.close()
+
+async def start_server(asgi_app=app, host: str = "127.0.0.1", port: int = 8000):
+    """Starts serving 'asgi_app' and returns the asyncio server (port 0 picks a free port)."""
+    return await asyncio.start_server(partial(_handle_connection, asgi_app), host, port, backlog=1024)
+
+async def serve(asgi_app=app, host: str = "127.0.0.1", port: int = 8000):
+    server = await start_server(asgi_app, host, port)
+    print(f"LMS HTTP service listening on http://{host}:{server.sockets[0].getsockname()[1]}")
+    async with server:
+        await server.serve_forever()
+
+if __name__ == "__main__":
+    # Usage: python http_service.py [host] [port]
+    initialize_database()
+    try:
+        asyncio.run(serve(app, sys.argv[1] if len(sys.argv) > 1 else "127.0.0.1", int(sys.argv[2]) if len(sys.argv) > 2 else 8000))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        app.shutdown()
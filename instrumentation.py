@@ -0,0 +1,306 @@
+import bisect
+import functools
+import json
+import math
+import os
+import threading
+import time
+from collections import Counter, deque
+
+# --- 1. Rolling Histograms ---
+
+LATENCY_BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+ROLLING_WINDOW_SECONDS = 300
+ROLLING_SAMPLES = 2048
+
+class RollingHistogram:
+    """
+    Latency histogram in milliseconds.
+
+    Bucket counts, sum and count are cumulative since start-up (what
+    Prometheus expects); percentiles are computed from the samples of the
+    last 'window' seconds, capped at 'max_samples', so they track current
+    behaviour rather than the whole session.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS_MS, window: float = ROLLING_WINDOW_SECONDS, max_samples: int = ROLLING_SAMPLES):
+        self.buckets = tuple(buckets)
+        self.window = window
+        self.counts = [0] * (len(self.buckets) + 1) # Last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self._recent = deque(maxlen=max_samples) # (monotonic time, ms)
+        self._lock = threading.Lock()
+
+    def observe(self, ms: float):
+        now = time.monotonic()
+        with self._lock:
+            self.counts[bisect.bisect_left(self.buckets, ms)] += 1
+            self.count += 1
+            self.sum += ms
+            self._recent.append((now, ms))
+
+    def recent(self) -> list:
+        """Sorted samples from the rolling window."""
+        cutoff = time.monotonic() - self.window
+        with self._lock:
+            while self._recent and self._recent[0][0] < cutoff:
+                self._recent.popleft()
+            return sorted(ms for _, ms in self._recent)
+
+    def percentile(self, pct: float, recent: list = None):
+        recent = self.recent() if recent is None else recent
+        if not recent:
+            return None
+        return recent[max(0, math.ceil(pct / 100 * len(recent)) - 1)]
+
+    def cumulative_buckets(self) -> list:
+        """[(upper bound in ms or '+Inf', observations <= bound)] as in a Prometheus histogram."""
+        with self._lock:
+            counts = list(self.counts)
+        total = 0
+        result = []
+        for bound, count in zip(self.buckets + ("+Inf",), counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+    def snapshot(self) -> dict:
+        recent = self.recent()
+        return {
+            "count": self.count,
+            "sum_ms": round(self.sum, 3),
+            "window_samples": len(recent),
+            "p50_ms": _round(self.percentile(50, recent)),
+            "p95_ms": _round(self.percentile(95, recent)),
+            "p99_ms": _round(self.percentile(99, recent)),
+            "max_ms": _round(recent[-1] if recent else None),
+            "buckets": {str(bound): count for bound, count in self.cumulative_buckets()},
+        }
+
+def _round(value):
+    return round(value, 3) if value is not None else None
+
+class CallStats:
+    """Latency, error and SQL totals for one instrumented function. SQL counts include nested calls."""
+
+    def __init__(self):
+        self.latency = RollingHistogram()
+        self.calls = 0
+        self.errors = 0
+        self.sql_statements = 0
+        self.sql_ms = 0.0
+        self.last_sql_statements = 0
+        self._lock = threading.Lock()
+
+    def record(self, ms: float, sql_statements: int, sql_ms: float, failed: bool):
+        self.latency.observe(ms)
+        with self._lock:
+            self.calls += 1
+            self.errors += failed
+            self.sql_statements += sql_statements
+            self.sql_ms += sql_ms
+            self.last_sql_statements = sql_statements
+
+    def snapshot(self) -> dict:
+        return dict(
+            self.latency.snapshot(),
+            calls=self.calls,
+            errors=self.errors,
+            sql_statements=self.sql_statements,
+            sql_ms=round(self.sql_ms, 3),
+            sql_per_call=round(self.sql_statements / self.calls, 2) if self.calls else None,
+            last_sql_statements=self.last_sql_statements,
+        )
+
+# --- 2. Registry ---
+
+UNTRACKED = "(untracked)" # SQL issued outside any instrumented function
+
+class Metrics:
+    """
+    Process-wide collection of call stats, named timers and counters.
+    Disable with LMS_INSTRUMENTATION=0; the hooks then cost one flag check.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.started = time.time()
+        self.calls = {}
+        self.timers = {}
+        self.counters = Counter() # (name, ((label, value), ...)) -> count
+        self.sql = RollingHistogram() # Every statement, whoever issued it
+        self._lock = threading.Lock()
+
+    def call_stats(self, name: str) -> CallStats:
+        stats = self.calls.get(name)
+        if stats is None:
+            with self._lock:
+                stats = self.calls.setdefault(name, CallStats())
+        return stats
+
+    def timer(self, name: str) -> RollingHistogram:
+        histogram = self.timers.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self.timers.setdefault(name, RollingHistogram())
+        return histogram
+
+    def increment(self, name: str, amount: int = 1, **labels):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[(name, tuple(sorted((k, str(v)) for k, v in labels.items())))] += amount
+
+    def observe(self, name: str, ms: float):
+        if self.enabled:
+            self.timer(name).observe(ms)
+
+    def reset(self):
+        with self._lock:
+            self.started = time.time()
+            self.calls = {}
+            self.timers = {}
+            self.counters = Counter()
+            self.sql = RollingHistogram()
+
+    def snapshot(self) -> dict:
+        counters = {}
+        for (name, labels), count in sorted(self.counters.items()):
+            key = name + ("{" + ",".join(f"{k}={v}" for k, v in labels) + "}" if labels else "")
+            counters[key] = count
+        return {
+            "uptime_seconds": round(time.time() - self.started, 1),
+            "sql": self.sql.snapshot(),
+            "calls": {name: stats.snapshot() for name, stats in sorted(self.calls.items())},
+            "timers": {name: histogram.snapshot() for name, histogram in sorted(self.timers.items())},
+            "counters": counters,
+        }
+
+    def to_json(self, indent: int = None) -> str:
+        return json.dumps(self.snapshot(), indent=indent)
+
+    def to_prometheus(self, prefix: str = "lms") -> str:
+        """Renders everything in the Prometheus text exposition format (durations in seconds)."""
+        lines = []
+        _prometheus_histogram(lines, f"{prefix}_sql_statement_duration_seconds", [({}, self.sql)])
+        calls = sorted(self.calls.items())
+        _prometheus_histogram(lines, f"{prefix}_call_duration_seconds", [({"function": name}, stats.latency) for name, stats in calls])
+        for metric, value in (("call_errors_total", lambda stats: stats.errors), ("sql_statements_total", lambda stats: stats.sql_statements),
+                              ("sql_duration_seconds_total", lambda stats: stats.sql_ms / 1000)):
+            lines.append(f"# TYPE {prefix}_{metric} counter")
+            lines.extend(f"{prefix}_{metric}{_labels({'function': name})} {value(stats)}" for name, stats in calls)
+        for name, histogram in sorted(self.timers.items()):
+            _prometheus_histogram(lines, f"{prefix}_{name}_duration_seconds", [({}, histogram)])
+        seen = set()
+        for (name, labels), count in sorted(self.counters.items()):
+            if name not in seen:
+                lines.append(f"# TYPE {prefix}_{name}_total counter")
+                seen.add(name)
+            lines.append(f"{prefix}_{name}_total{_labels(dict(labels))} {count}")
+        return "\n".join(lines) + "\n"
+
+    def status_line(self) -> str:
+        """One-line summary for a status bar: query volume, SQL p95, the slowest call and the ISBN cache hit rate."""
+        parts = [f"DB: {self.sql.count} queries"]
+        sql_p95 = self.sql.percentile(95)
+        if sql_p95 is not None:
+            parts.append(f"p95 {sql_p95:.1f} ms")
+        slowest = max(
+            ((stats.latency.percentile(95), name) for name, stats in list(self.calls.items()) if name != UNTRACKED),
+            key=lambda item: item[0] or 0, default=(None, None)
+        )
+        if slowest[0] is not None:
+            parts.append(f"slowest {slowest[1]} {slowest[0]:.0f} ms")
+        lookups = Counter()
+        for (name, labels), count in list(self.counters.items()):
+            if name == "isbn_cache_lookups":
+                lookups[dict(labels).get("result") == "miss"] += count
+        if sum(lookups.values()):
+            parts.append(f"ISBN cache {100 * lookups[False] / sum(lookups.values()):.0f}% hits")
+        return " | ".join(parts)
+
+def _labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for v in labels.values())
+    return "{" + ",".join(f'{k}="{v}"' for k, v in zip(labels, escaped)) + "}"
+
+def _prometheus_histogram(lines: list, name: str, series: list):
+    lines.append(f"# TYPE {name} histogram")
+    for labels, histogram in series:
+        for bound, count in histogram.cumulative_buckets():
+            le = bound if bound == "+Inf" else f"{bound / 1000:g}"
+            lines.append(f"{name}_bucket{_labels(dict(labels, le=le))} {count}")
+        lines.append(f"{name}_sum{_labels(labels)} {histogram.sum / 1000}")
+        lines.append(f"{name}_count{_labels(labels)} {histogram.count}")
+
+metrics = Metrics(enabled=os.environ.get("LMS_INSTRUMENTATION", "1") != "0")
+
+# --- 3. Hooks ---
+
+_local = threading.local() # Per-thread stack of the instrumented calls in progress
+
+def _frames() -> list:
+    frames = getattr(_local, "frames", None)
+    if frames is None:
+        frames = _local.frames = []
+    return frames
+
+def timed(func):
+    """
+    Records the latency of each call to 'func' and the SQL statements it
+    (and anything it calls) issued on this thread, under the function's name.
+    """
+    stats_name = func.__name__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not metrics.enabled:
+            return func(*args, **kwargs)
+        frame = [0, 0.0] # SQL statements, SQL ms
+        frames = _frames()
+        frames.append(frame)
+        failed = False
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            frames.pop()
+            metrics.call_stats(stats_name).record(elapsed, frame[0], frame[1], failed)
+    return wrapper
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if metrics.enabled:
+        conn.info.setdefault("lms_query_started", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("lms_query_started")
+    if not starts:
+        return
+    elapsed = (time.perf_counter() - starts.pop()) * 1000
+    metrics.sql.observe(elapsed)
+    frames = _frames()
+    for frame in frames:
+        frame[0] += 1
+        frame[1] += elapsed
+    if not frames:
+        metrics.call_stats(UNTRACKED).record(elapsed, 1, elapsed, False)
+
+def _handle_error(exception_context):
+    # A failed statement never reaches after_cursor_execute; drop its start time
+    starts = exception_context.connection.info.get("lms_query_started") if exception_context.connection is not None else None
+    if starts:
+        starts.pop()
+
+def instrument_engine(bind):
+    """Counts and times every statement executed through 'bind', attributing it to the instrumented calls in progress."""
+    from sqlalchemy import event # Imported here so the GUI can import this module before SQLAlchemy
+    event.listen(bind, "before_cursor_execute", _before_cursor_execute)
+    event.listen(bind, "after_cursor_execute", _after_cursor_execute)
+    event.listen(bind, "handle_error", _handle_error)
+    return bind
@@ -1,10 +1,17 @@
+import time
+_STARTED = time.perf_counter() # Start-up milestones are measured from here
 import tkinter as tk
 from tkinter import Menu, Frame, Label, Button, messagebox, ttk
-from lms_api_service import lookup_book_by_isbn # Import the API service
-from PIL import Image, ImageTk
+from instrumentation import metrics
 import io
-import requests
-from lms_models import initialize_database, SessionLocal, add_book_to_db, issue_book, return_book, Member, Book # Import DB functions and models
+import json
+import os
+import queue
+import sys
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+# PIL, requests (via lms_api_service and cover_cache) and the SQLAlchemy models
+# are imported where they are first used, so the window shows before they load.
 
 # --- Design Constants ---
 PRIMARY_COLOR = "#007bff"  # Blue
@@ -13,15 +20,248 @@ SUCCESS_COLOR = "#28a745"  # Green
 DANGER_COLOR = "#dc3545"   # Red
 FONT_FAMILY = "Arial"
 
+COVER_PHOTO_CACHE_SIZE = 64 # Decoded PhotoImages kept in memory
+LAZY_TABS = os.environ.get("LMS_LAZY_TABS", "1") != "0" # Build each tab on first selection
+
+STARTUP_MARKS = {} # Milestone -> ms since this module started importing
+
+def mark_startup(name):
+    STARTUP_MARKS.setdefault(name, round((time.perf_counter() - _STARTED) * 1000, 1))
+
+def load_backend():
+    """Imports the model layer and brings the schema up to date. Runs on a worker once the window is showing."""
+    from lms_models import initialize_database
+    initialize_database()
+
+def seed_initial_data(db_session):
+    """Adds a dummy member and book to an empty database. Returns the setup notes to show."""
+    from lms_models import Member, Book, register_member, add_book_to_db
+    from lms_api_service import lookup_book_by_isbn
+    notes = []
+    if not db_session.query(Member).first():
+        register_member(db_session, {"membership_number": "M001", "first_name": "Alice", "last_name": "Smith"})
+        notes.append("Dummy Member (ID: 1) added for testing.")
+    if not db_session.query(Book).first():
+        book_data = lookup_book_by_isbn("9780345391803")
+        if book_data["success"]: add_book_to_db(db_session, book_data)
+        notes.append("Dummy Book (ID: 1) added for testing.")
+    return notes
+
+def add_book_row(db_session, book_data):
+    """Adds a book (or a copy of an existing one) and returns its list row, which stays readable once the session closes."""
+    from lms_models import add_book_to_db, get_book_row
+    return get_book_row(db_session, add_book_to_db(db_session, book_data).book_id)
+
+def register_member_row(db_session, member_data):
+    """Registers a member and returns their list row."""
+    from lms_models import register_member, get_member_row
+    return get_member_row(db_session, register_member(db_session, member_data).member_id)
+
+def fetch_cover_image(url):
+    """Returns (url, PIL image) for a cover, already resized to the display size. Runs on a worker."""
+    from cover_cache import cover_cache
+    from PIL import Image
+    # Served from the on-disk thumbnail cache; only downloads on a miss
+    thumbnail = cover_cache.fetch_thumbnail(url)
+    image = Image.open(io.BytesIO(thumbnail))
+    image.load()
+    return url, image
+
+class BackgroundTasks:
+    """
+    Runs blocking database and network work off the Tk main loop.
+
+    Results are handed back through a queue drained on the main thread with
+    after(), so callbacks may touch widgets. Submitting with a 'key' supersedes
+    any earlier task with the same key: it is cancelled if it has not started,
+    and its result is discarded if it has.
+    """
+
+    def __init__(self, master, workers=4, poll_ms=50):
+        self.master = master
+        self.poll_ms = poll_ms
+        self.status_var = None # Set once the status bar exists
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="lms-gui")
+        self._results = queue.Queue()
+        self._latest = {} # key -> future of the current (non-superseded) task
+        self._running = {} # future -> description, for the status bar
+        master.after(poll_ms, self._drain)
+
+    def submit(self, func, *args, on_done=None, on_error=None, key=None, description="Working"):
+        if key is not None:
+            previous = self._latest.get(key)
+            if previous is not None:
+                previous.cancel()
+        future = self._executor.submit(func, *args)
+        if key is not None:
+            self._latest[key] = future
+        self._running[future] = description
+        self._update_status()
+        future.add_done_callback(lambda f: self._results.put((f, key, on_done, on_error)))
+        return future
+
+    def submit_db(self, func, *args, **kwargs):
+        """Like submit, but calls func(db_session, *args) with a session scoped to the task."""
+        from lms_models import run_in_session
+        return self.submit(run_in_session, func, *args, **kwargs)
+
+    def cancel(self, key):
+        """Cancels the current task for 'key', discarding its result if it already started."""
+        future = self._latest.pop(key, None)
+        if future is not None:
+            future.cancel()
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _drain(self):
+        while True:
+            try:
+                future, key, on_done, on_error = self._results.get_nowait()
+            except queue.Empty:
+                break
+            self._running.pop(future, None)
+            superseded = key is not None and self._latest.get(key) is not future
+            if key is not None and not superseded:
+                del self._latest[key]
+            if future.cancelled() or superseded:
+                continue
+            error = future.exception()
+            if error is not None:
+                if on_error:
+                    on_error(error)
+                else:
+                    print(f"Background task failed: {error}")
+            elif on_done:
+                on_done(future.result())
+        self._update_status()
+        self.master.after(self.poll_ms, self._drain)
+
+    def _update_status(self):
+        if self.status_var is None:
+            return
+        running = list(self._running.values())
+        if not running:
+            self.status_var.set("Idle")
+        elif len(running) == 1:
+            self.status_var.set(f"{running[0]}...")
+        else:
+            self.status_var.set(f"{running[0]}... (+{len(running) - 1} more)")
+
+class PagedTreeview:
+    """
+    Treeview that loads rows a page at a time with keyset pagination.
+
+    Only the first page is fetched up front; the next page is prefetched as
+    the user scrolls towards the end of what is loaded. Single rows can be
+    refreshed in place after a transaction instead of rebuilding the tree.
+    """
+
+    def __init__(self, parent, columns, fetch_page, fetch_row, to_values, tasks, page_size=200, prefetch_at=0.8):
+        self.fetch_page = fetch_page # (after_key, limit) -> rows whose first field is the key; runs on a worker
+        self.fetch_row = fetch_row # key -> row or None; runs on a worker
+        self.to_values = to_values
+        self.tasks = tasks
+        self.page_size = page_size
+        self.prefetch_at = prefetch_at
+        self.last_key = None
+        self.exhausted = False
+        self.showing_fixed_rows = False
+        self._loading = False
+
+        self.frame = ttk.Frame(parent)
+        self.tree = ttk.Treeview(self.frame, columns=columns, show="headings")
+        self.scrollbar = ttk.Scrollbar(self.frame, orient=tk.VERTICAL, command=self.tree.yview)
+        self.tree.configure(yscrollcommand=self._on_scroll)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree.pack(side=tk.LEFT, expand=True, fill="both")
+
+    def pack(self, **kwargs):
+        self.frame.pack(**kwargs)
+
+    def _on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        # Also fires when the loaded rows don't fill the view, which keeps fetching until they do
+        if float(last) >= self.prefetch_at and not self.exhausted:
+            self.tree.after_idle(self.load_next_page)
+
+    def reset(self):
+        """Drops every loaded row and starts again from the first page."""
+        self.tree.delete(*self.tree.get_children())
+        self.last_key = None
+        self.exhausted = False
+        self.showing_fixed_rows = False
+        self._loading = False # Any in-flight page load is superseded below
+        self.load_next_page()
+
+    def load_next_page(self):
+        if self._loading or self.exhausted:
+            return
+        self._loading = True
+        self.tasks.submit(
+            self.fetch_page, self.last_key, self.page_size,
+            on_done=self._append_page, on_error=self._page_failed,
+            key=("page", id(self)), description="Loading rows"
+        )
+
+    def _append_page(self, rows):
+        self._loading = False
+        for row in rows:
+            if not self.tree.exists(str(row[0])):
+                self.tree.insert("", tk.END, iid=str(row[0]), values=self.to_values(row))
+        if rows:
+            self.last_key = rows[-1][0]
+        self.exhausted = len(rows) < self.page_size
+
+    def show_rows(self, rows):
+        """Replaces the paged contents with a fixed result set (e.g. search results)."""
+        self.tasks.cancel(("page", id(self)))
+        self.tree.delete(*self.tree.get_children())
+        self._loading = False
+        self.exhausted = True # Stop paging until the next reset()
+        self.showing_fixed_rows = True
+        self.last_key = None
+        for row in rows:
+            self.tree.insert("", tk.END, iid=str(row[0]), values=self.to_values(row))
+
+    def _page_failed(self, error):
+        self._loading = False
+        print(f"Error loading rows: {error}")
+
+    def update_row(self, key):
+        """Re-reads one row in the background, then shows it with apply_row."""
+        self.tasks.submit(
+            self.fetch_row, key, on_done=lambda row: self.apply_row(key, row),
+            key=("row", id(self), key), description="Refreshing row"
+        )
+
+    def apply_row(self, key, row):
+        """Updates a row in place, or appends it if it belongs after the loaded pages; None removes it."""
+        iid = str(key)
+        if row is None:
+            if self.tree.exists(iid):
+                self.tree.delete(iid)
+        elif self.tree.exists(iid):
+            self.tree.item(iid, values=self.to_values(row))
+        elif self.exhausted and not self.showing_fixed_rows:
+            self.tree.insert("", tk.END, iid=iid, values=self.to_values(row))
+            self.last_key = key
+
 class LMSApp:
-    def __init__(self, master):
-        # Initialize Database
-        initialize_database()
-        self.db_session = SessionLocal() # Keep a session open for simplicity in this example
+    FONT_FAMILY = FONT_FAMILY
+
+    def __init__(self, master, lazy_tabs=LAZY_TABS, profile_startup=False):
+        # The database layer loads in the background once the window is up (see start_backend)
+        self.backend_ready = False
+        self.lazy_tabs = lazy_tabs
+        self.profile_startup = profile_startup
         
         self.master = master
         master.title("Library Management System")
         master.geometry("1024x768")
+        
+        # Worker pool for blocking DB/network calls; each task gets its own session
+        self.tasks = BackgroundTasks(master)
 
         # Configure styles for a modern look
         self.style = ttk.Style()
@@ -37,21 +277,64 @@ class LMSApp:
         self.create_toolbar()
 
         # 3. Main Content Area (Using Notebook for sections)
+        # Each tab starts as an empty frame and is filled in on first selection
         self.notebook = ttk.Notebook(master)
         self.notebook.pack(expand=True, fill="both", padx=10, pady=10)
-        
-        self.create_dashboard_tab()
-        self.create_book_management_tab()
-        self.create_member_management_tab()
-        self.create_transaction_management_tab()
+        self.tab_builders = {}
+        self.built_tabs = set()
+        for title, builder in (("Dashboard", self.create_dashboard_tab), ("Book Management", self.create_book_management_tab),
+                               ("Member Management", self.create_member_management_tab), ("Transactions", self.create_transaction_management_tab)):
+            frame = ttk.Frame(self.notebook, padding="10 10 10 10")
+            self.notebook.add(frame, text=title)
+            self.tab_builders[str(frame)] = (frame, builder)
+        self.notebook.bind("<<NotebookTabChanged>>", self.build_selected_tab)
 
         # 4. Status Bar
         self.create_status_bar()
         self.update_status_simulated()
-        
+        mark_startup("window_built")
+
+        # Database and initial data load once the event loop is running
+        master.after_idle(self.start_backend)
+
+    # --- Start-up ---
+    def start_backend(self):
+        mark_startup("first_idle")
+        self.tasks.submit(load_backend, on_done=self.on_backend_ready, on_error=self.on_backend_failed, description="Opening database")
+
+    def on_backend_ready(self, result):
+        mark_startup("backend_ready")
+        self.backend_ready = True
+        if self.lazy_tabs:
+            self.build_selected_tab()
+        else:
+            for key in self.tab_builders:
+                self.build_tab(key)
         # Initial data load for testing
         self.load_initial_data()
 
+    def on_backend_failed(self, error):
+        messagebox.showerror("Database Error", f"Could not open the database: {error}")
+
+    def build_selected_tab(self, event=None):
+        if self.backend_ready:
+            self.build_tab(self.notebook.select())
+
+    def build_tab(self, key):
+        if key in self.built_tabs or key not in self.tab_builders:
+            return
+        self.built_tabs.add(key)
+        frame, builder = self.tab_builders[key]
+        builder(frame)
+        mark_startup("first_tab_built")
+
+    def finish_startup_profile(self):
+        """Prints the start-up milestones as JSON and closes the window (python main.py --profile-startup)."""
+        self.profile_startup = False
+        print(json.dumps({"startup_ms": STARTUP_MARKS, "lazy_tabs": self.lazy_tabs}))
+        self.tasks.shutdown()
+        self.master.destroy()
+
     # --- Menu Bar Implementation ---
     def create_menu_bar(self):
         menubar = Menu(self.master)
@@ -101,9 +384,7 @@ class LMSApp:
         button.pack(side=tk.LEFT, padx=5, pady=5)
 
     # --- Tabbed Sections ---
-    def create_dashboard_tab(self):
-        dashboard_frame = ttk.Frame(self.notebook, padding="10 10 10 10")
-        self.notebook.add(dashboard_frame, text="Dashboard")
+    def create_dashboard_tab(self, dashboard_frame):
         ttk.Label(dashboard_frame, text="Dashboard: Key Statistics", style="Header.TLabel").pack(pady=20)
         
         # Statistics Frame
@@ -113,6 +394,8 @@ class LMSApp:
         self.total_books_var = tk.StringVar()
         self.total_members_var = tk.StringVar()
         self.books_on_loan_var = tk.StringVar()
+        self.overdue_books_var = tk.StringVar()
+        self.total_fines_var = tk.StringVar()
         
         ttk.Label(stats_frame, text="Total Books:", font=(self.FONT_FAMILY, 12, 'bold')).grid(row=0, column=0, padx=10, pady=5, sticky="w")
         ttk.Label(stats_frame, textvariable=self.total_books_var, font=(self.FONT_FAMILY, 12)).grid(row=0, column=1, padx=10, pady=5, sticky="w")
@@ -123,6 +406,12 @@ class LMSApp:
         ttk.Label(stats_frame, text="Books on Loan:", font=(self.FONT_FAMILY, 12, 'bold')).grid(row=2, column=0, padx=10, pady=5, sticky="w")
         ttk.Label(stats_frame, textvariable=self.books_on_loan_var, font=(self.FONT_FAMILY, 12)).grid(row=2, column=1, padx=10, pady=5, sticky="w")
         
+        ttk.Label(stats_frame, text="Overdue Books:", font=(self.FONT_FAMILY, 12, 'bold')).grid(row=3, column=0, padx=10, pady=5, sticky="w")
+        ttk.Label(stats_frame, textvariable=self.overdue_books_var, font=(self.FONT_FAMILY, 12)).grid(row=3, column=1, padx=10, pady=5, sticky="w")
+        
+        ttk.Label(stats_frame, text="Fines Assessed:", font=(self.FONT_FAMILY, 12, 'bold')).grid(row=4, column=0, padx=10, pady=5, sticky="w")
+        ttk.Label(stats_frame, textvariable=self.total_fines_var, font=(self.FONT_FAMILY, 12)).grid(row=4, column=1, padx=10, pady=5, sticky="w")
+        
         ttk.Separator(dashboard_frame, orient='horizontal').pack(fill='x', pady=10)
         
         # Report and Action Buttons Frame
@@ -139,29 +428,61 @@ class LMSApp:
 
     def update_dashboard_stats(self):
         from lms_models import get_dashboard_stats
-        stats = get_dashboard_stats(self.db_session)
+        if not hasattr(self, "total_books_var"):
+            return # The dashboard loads its statistics when it is first opened
+        self.tasks.submit_db(get_dashboard_stats, on_done=self.show_dashboard_stats, key="dashboard_stats", description="Loading statistics")
+
+    def show_dashboard_stats(self, stats):
         self.total_books_var.set(stats["total_books"])
         self.total_members_var.set(stats["total_members"])
         self.books_on_loan_var.set(stats["books_on_loan"])
+        self.overdue_books_var.set(stats["overdue_books"])
+        self.total_fines_var.set(f"${stats['total_fines']:.2f}")
+        if "dashboard_loaded" not in STARTUP_MARKS:
+            mark_startup("dashboard_loaded")
+            print(f"Startup: window {STARTUP_MARKS['window_built']} ms, database {STARTUP_MARKS['backend_ready']} ms, "
+                  f"dashboard {STARTUP_MARKS['dashboard_loaded']} ms")
+        if self.profile_startup:
+            self.finish_startup_profile()
 
     def handle_send_reminders(self):
         from lms_models import send_due_date_reminders
         
-        # The send_due_date_reminders function handles both upcoming and overdue alerts
-        summary = send_due_date_reminders(self.db_session)
-        
+        # The send_due_date_reminders function queues both upcoming and overdue alerts
+        self.tasks.submit_db(
+            send_due_date_reminders,
+            on_done=self.show_reminders_queued,
+            on_error=lambda e: messagebox.showerror("Error", f"Failed to queue reminders: {e}"),
+            key="reminders", description="Queueing reminders"
+        )
+
+    def show_reminders_queued(self, job):
         messagebox.showinfo(
-            "Reminders Sent",
-            f"Notification Summary:\n\n"
-            f"Reminders for books due soon: {summary['reminders_sent']} sent.\n"
-            f"Alerts for overdue books: {summary['overdue_alerts_sent']} sent.\n\n"
-            f"Check the console for simulated SMS/Email content."
+            "Reminders Queued",
+            f"Notification Summary (job #{job.job_id}):\n\n"
+            f"Reminders for books due soon: {job.queued_by_tag[('reminder', 'email')]} queued.\n"
+            f"Alerts for overdue books: {job.queued_by_tag[('overdue', 'email')]} queued.\n\n"
+            f"Delivery progress is shown in the status bar."
         )
+        self.poll_notification_job(job)
+
+    def poll_notification_job(self, job):
+        """Shows a notification job's progress in the status bar until it finishes."""
+        summary = job.summary()
+        self.api_status.set(f"Notifications: {summary['sent']} sent, {summary['failed']} failed, {summary['pending']} pending")
+        if not job.done():
+            self.master.after(500, self.poll_notification_job, job)
 
     def show_overdue_report(self):
         from lms_models import get_overdue_transactions
-        overdue_list = get_overdue_transactions(self.db_session)
-        
+        self.tasks.submit_db(
+            get_overdue_transactions,
+            on_done=self.show_overdue_report_window,
+            on_error=lambda e: messagebox.showerror("Error", f"Failed to load overdue report: {e}"),
+            key="overdue_report", description="Loading overdue report"
+        )
+
+    def show_overdue_report_window(self, overdue_list):
         if not overdue_list:
             messagebox.showinfo("Overdue Report", "No books are currently overdue.")
             return
@@ -199,21 +520,7 @@ class LMSApp:
 
         tree.pack(expand=True, fill="both", padx=10, pady=10)
         
-    def create_book_management_tab(self):
-        book_frame = ttk.Frame(self.notebook, padding="10 10 10 10")
-        self.notebook.add(book_frame, text="Book Management")
-        ttk.Label(book_frame, text="Book Management", style="Header.TLabel").pack(pady=10)
-        
-        # Notebook for Book Management Tabs
-        book_notebook = ttk.Notebook(book_frame)
-        book_notebook.pack(expand=True, fill="both")
-        
-        # Tab 1: ISBN Lookup
-        lookup_tab = ttk.Frame(book_notebook, padding="10 10 10 10")
-        book_notebook.add(lookup_tab, text="Add Book (ISBN Lookup)")
-     def create_book_management_tab(self):
-        book_frame = ttk.Frame(self.notebook, padding="10 10 10 10")
-        self.notebook.add(book_frame, text="Book Management")
+    def create_book_management_tab(self, book_frame):
         ttk.Label(book_frame, text="Book Management", style="Header.TLabel").pack(pady=10)
         
         # Notebook for Book Management Tabs
@@ -247,6 +554,7 @@ class LMSApp:
         self.cover_image_label = ttk.Label(details_frame)
         self.cover_image_label.grid(row=0, column=2, rowspan=len(self.book_details_vars)+1, padx=10, pady=5)
         self.cover_image_tk = None # To prevent garbage collection
+        self.cover_photos = OrderedDict() # LRU of decoded covers, keyed by URL
         
         for i, (label_text, var) in enumerate(self.book_details_vars.items()):
             ttk.Label(details_frame, text=f"{label_text}:", font=(self.FONT_FAMILY, 10, 'bold')).grid(row=i, column=0, padx=5, pady=2, sticky="w")
@@ -256,8 +564,27 @@ class LMSApp:
         self.add_book_button.grid(row=len(self.book_details_vars), column=0, columnspan=2, pady=10)
 
     def create_view_all_books_section(self, parent):
-        # Treeview for displaying all books
-        self.book_tree = ttk.Treeview(parent, columns=("ID", "Title", "Author", "ISBN", "Total", "Available"), show="headings")
+        from lms_models import run_in_session, get_books_page, get_book_row
+        # Search bar (type-ahead over title, author, category and description)
+        search_frame = ttk.Frame(parent)
+        search_frame.pack(fill="x", pady=(0, 5))
+        ttk.Label(search_frame, text="Search:").pack(side=tk.LEFT, padx=5)
+        self.book_search_var = tk.StringVar()
+        search_entry = ttk.Entry(search_frame, textvariable=self.book_search_var, width=40)
+        search_entry.pack(side=tk.LEFT, padx=5)
+        search_entry.bind("<KeyRelease>", self.schedule_book_search)
+        self.book_search_after_id = None
+
+        # Paged Treeview for displaying all books
+        self.book_grid = PagedTreeview(
+            parent,
+            columns=("ID", "Title", "Author", "ISBN", "Total", "Available"),
+            fetch_page=lambda after_id, limit: run_in_session(get_books_page, after_id, limit),
+            fetch_row=lambda book_id: run_in_session(get_book_row, book_id),
+            to_values=lambda book: (book.book_id, book.title, book.author, book.isbn, book.total_copies, book.available_copies),
+            tasks=self.tasks
+        )
+        self.book_tree = self.book_grid.tree
         self.book_tree.heading("ID", text="ID")
         self.book_tree.heading("Title", text="Title")
         self.book_tree.heading("Author", text="Author")
@@ -272,32 +599,42 @@ class LMSApp:
         self.book_tree.column("Total", width=80, anchor="center")
         self.book_tree.column("Available", width=80, anchor="center")
         
-        self.book_tree.pack(expand=True, fill="both")
+        self.book_grid.pack(expand=True, fill="both")
         
         ttk.Button(parent, text="Refresh Book List", command=self.refresh_book_list).pack(pady=5)
         
         self.refresh_book_list()
 
     def refresh_book_list(self):
-        from lms_models import get_all_books
-        
-        # Clear existing data
-        for item in self.book_tree.get_children():
-            self.book_tree.delete(item)
-            
-        books = get_all_books(self.db_session)
-        for book in books:
-            self.book_tree.insert("", tk.END, values=(
-                book.book_id,
-                book.title,
-                book.author,
-                book.isbn,
-                book.total_copies,
-                book.available_copies
-            ))  def handle_isbn_lookup(self):
+        # Reload from the first page; further pages are fetched as the user scrolls
+        self.book_search_var.set("")
+        self.tasks.cancel("book_search")
+        self.book_grid.reset()
+
+    def schedule_book_search(self, event=None):
+        # Debounce keystrokes so only the last one in a burst runs a search
+        if self.book_search_after_id is not None:
+            self.master.after_cancel(self.book_search_after_id)
+        self.book_search_after_id = self.master.after(150, self.run_book_search)
+
+    def run_book_search(self):
+        from lms_models import search_books
+        self.book_search_after_id = None
+        query = self.book_search_var.get().strip()
+        if not query:
+            self.tasks.cancel("book_search")
+            self.book_grid.reset()
+            return
+        self.tasks.submit_db(search_books, query, 200, on_done=self.book_grid.show_rows, key="book_search", description="Searching")
+
+    def handle_isbn_lookup(self):
+        from lms_api_service import lookup_book_by_isbn
         isbn = self.isbn_entry.get().strip()
         if not isbn: return messagebox.showerror("Error", "Please enter an ISBN.")
-        result = lookup_book_by_isbn(isbn)
+        # A newer lookup supersedes one still in flight
+        self.tasks.submit(lookup_book_by_isbn, isbn, on_done=self.show_isbn_lookup_result, key="isbn_lookup", description=f"Looking up ISBN {isbn}")
+
+    def show_isbn_lookup_result(self, result):
         if result.get("success"):
             messagebox.showinfo("Success", f"Book found: {result['title']}")
             self.update_book_details_display(result)
@@ -316,53 +653,63 @@ class LMSApp:
             var.set(data.get(key.lower().replace(' ', '_'), "N/A"))
 
     def display_book_cover(self, url):
-        """Downloads and displays the book cover image."""
+        """Downloads the book cover in the background and displays it."""
         self.cover_image_label.config(image='') # Clear previous image
         self.cover_image_tk = None
         
         if not url:
+            self.tasks.cancel("cover") # Drop any cover still downloading
             self.cover_image_label.config(text="No Cover")
             return
 
-        try:
-            # Download image
-            response = requests.get(url, stream=True)
-            response.raise_for_status()
-            image_data = response.content
-            
-            # Open image with PIL
-            image = Image.open(io.BytesIO(image_data))
-            
-            # Resize image to fit the display area (e.g., 100x150)
-            max_size = (100, 150)
-            image.thumbnail(max_size)
-            
-            # Convert to Tkinter PhotoImage
-            self.cover_image_tk = ImageTk.PhotoImage(image)
-            
-            # Display image
-            self.cover_image_label.config(image=self.cover_image_tk, text='')
-            
-        except Exception as e:
-            self.cover_image_label.config(text="Image Error")
-            print(f"Error displaying image: {e}")
+        photo = self.cover_photos.get(url)
+        if photo is not None:
+            self.tasks.cancel("cover")
+            self.cover_photos.move_to_end(url)
+            self.cover_image_tk = photo
+            self.cover_image_label.config(image=photo, text='')
+            return
+
+        self.cover_image_label.config(text="Loading...")
+        self.tasks.submit(fetch_cover_image, url, on_done=self.show_cover_image, on_error=self.show_cover_error, key="cover", description="Loading cover")
+
+    def show_cover_image(self, result):
+        from PIL import ImageTk
+        url, image = result
+        # PhotoImage must be created on the Tk thread
+        self.cover_image_tk = ImageTk.PhotoImage(image)
+        self.cover_photos[url] = self.cover_image_tk
+        while len(self.cover_photos) > COVER_PHOTO_CACHE_SIZE:
+            self.cover_photos.popitem(last=False)
+        self.cover_image_label.config(image=self.cover_image_tk, text='')
+
+    def show_cover_error(self, error):
+        self.cover_image_label.config(text="Image Error")
+        print(f"Error displaying image: {error}")
 
     def handle_add_book_to_db(self):
         if self.last_lookup_data:
-            try:
-                new_book = add_book_to_db(self.db_session, self.last_lookup_data)
-                messagebox.showinfo("Success", f"Book '{new_book.title}' added/updated! Available copies: {new_book.available_copies}")
-                self.add_book_button.config(state=tk.DISABLED)
-                self.isbn_entry.delete(0, tk.END)
-                self.update_book_details_display({})
-                self.refresh_book_list() # Refresh the list after adding
-                self.update_dashboard_stats() # Update stats
-            except Exception as e:
-                messagebox.showerror("DB Error", f"Failed to add book: {e}")
-
-    def create_member_management_tab(self):
-        member_frame = ttk.Frame(self.notebook, padding="10 10 10 10")
-        self.notebook.add(member_frame, text="Member Management")
+            self.add_book_button.config(state=tk.DISABLED) # Until the add finishes, so one click adds one copy
+            self.tasks.submit_db(
+                add_book_row, self.last_lookup_data,
+                on_done=self.show_book_added,
+                on_error=self.show_add_book_error,
+                description="Adding book"
+            )
+
+    def show_book_added(self, book):
+        messagebox.showinfo("Success", f"Book '{book.title}' added/updated! Available copies: {book.available_copies}")
+        self.isbn_entry.delete(0, tk.END)
+        self.update_book_details_display({})
+        self.last_lookup_data = None
+        self.book_grid.apply_row(book.book_id, book) # Refresh only the added/updated row
+        self.update_dashboard_stats() # Update stats
+
+    def show_add_book_error(self, error):
+        self.add_book_button.config(state=tk.NORMAL)
+        messagebox.showerror("DB Error", f"Failed to add book: {error}")
+
+    def create_member_management_tab(self, member_frame):
         ttk.Label(member_frame, text="Member Management", style="Header.TLabel").pack(pady=10)
         
         # Notebook for Member Management Tabs
@@ -380,8 +727,17 @@ class LMSApp:
         self.create_view_all_members_section(view_tab)
 
     def create_view_all_members_section(self, parent):
-        # Treeview for displaying all members
-        self.member_tree = ttk.Treeview(parent, columns=("ID", "Name", "Membership No.", "Email", "Phone"), show="headings")
+        from lms_models import run_in_session, get_members_page, get_member_row
+        # Paged Treeview for displaying all members
+        self.member_grid = PagedTreeview(
+            parent,
+            columns=("ID", "Name", "Membership No.", "Email", "Phone"),
+            fetch_page=lambda after_id, limit: run_in_session(get_members_page, after_id, limit),
+            fetch_row=lambda member_id: run_in_session(get_member_row, member_id),
+            to_values=lambda member: (member.member_id, f"{member.first_name} {member.last_name}", member.membership_number, member.email, member.phone),
+            tasks=self.tasks
+        )
+        self.member_tree = self.member_grid.tree
         self.member_tree.heading("ID", text="ID")
         self.member_tree.heading("Name", text="Name")
         self.member_tree.heading("Membership No.", text="Membership No.")
@@ -394,30 +750,15 @@ class LMSApp:
         self.member_tree.column("Email", width=200)
         self.member_tree.column("Phone", width=100)
         
-        self.member_tree.pack(expand=True, fill="both")
+        self.member_grid.pack(expand=True, fill="both")
         
         ttk.Button(parent, text="Refresh Member List", command=self.refresh_member_list).pack(pady=5)
         
         self.refresh_member_list()
 
     def refresh_member_list(self):
-        from lms_models import get_all_members
-        
-        # Clear existing data
-        for item in self.member_tree.get_children():
-            self.member_tree.delete(item)
-            
-        members = get_all_members(self.db_session)
-        for member in members:
-            self.member_tree.insert("", tk.END, values=(
-                member.member_id,
-                f"{member.first_name} {member.last_name}",
-                member.membership_number,
-                member.email,
-                member.phone
-            ))
-        
-        self.create_member_registration_form(member_frame)
+        # Reload from the first page; further pages are fetched as the user scrolls
+        self.member_grid.reset()
 
     def create_member_registration_form(self, parent):
         form_frame = ttk.LabelFrame(parent, text="Member Details", padding="10 10 10 10")
@@ -446,32 +787,29 @@ class LMSApp:
             messagebox.showerror("Error", "All fields are required for registration.")
             return
 
-        try:
-            new_member = Member(
-                membership_number=data["Membership No."],
-                first_name=data["First Name"],
-                last_name=data["Last Name"],
-                email=data["Email"],
-                phone=data["Phone"]
-            )
-            self.db_session.add(new_member)
-            self.db_session.commit()
-            messagebox.showinfo("Success", f"Member {new_member.first_name} {new_member.last_name} registered successfully! ID: {new_member.member_id}")
-            
-            # Clear form
-            for var in self.member_vars.values():
-                var.set("")
-            
-            self.refresh_member_list() # Refresh the list after adding
-            self.update_dashboard_stats() # Update stats after registration
-
-        except Exception as e:
-            self.db_session.rollback()
-            messagebox.showerror("DB Error", f"Failed to register member. Check if Membership No. or Email is already in use.\nError: {e}")
-
-    def create_transaction_management_tab(self):
-        transaction_frame = ttk.Frame(self.notebook, padding="10 10 10 10")
-        self.notebook.add(transaction_frame, text="Transactions")
+        # The worker's session is rolled back if registration fails
+        self.tasks.submit_db(register_member_row, {
+            "membership_number": data["Membership No."],
+            "first_name": data["First Name"],
+            "last_name": data["Last Name"],
+            "email": data["Email"],
+            "phone": data["Phone"]
+        }, on_done=self.show_member_registered, on_error=lambda e: messagebox.showerror(
+            "DB Error", f"Failed to register member. Check if Membership No. or Email is already in use.\nError: {e}"
+        ), description="Registering member")
+
+    def show_member_registered(self, member):
+        messagebox.showinfo("Success", f"Member {member.first_name} {member.last_name} registered successfully! ID: {member.member_id}")
+        
+        # Clear form
+        for var in self.member_vars.values():
+            var.set("")
+        
+        if hasattr(self, "member_grid"):
+            self.member_grid.apply_row(member.member_id, member) # Show the new member if the last page is loaded
+        self.update_dashboard_stats() # Update stats after registration
+
+    def create_transaction_management_tab(self, transaction_frame):
         ttk.Label(transaction_frame, text="Issue & Return Books", style="Header.TLabel").pack(pady=10)
         self.create_issue_book_form(transaction_frame)
         self.create_return_book_form(transaction_frame)
@@ -486,13 +824,21 @@ class LMSApp:
         ttk.Button(issue_frame, text="Issue Book", command=self.handle_issue_book).grid(row=len(self.issue_vars), column=0, columnspan=2, pady=10)
 
     def handle_issue_book(self):
+        from lms_models import issue_book
         try:
             member_id, book_id = int(self.issue_vars["Member ID"].get()), int(self.issue_vars["Book ID"].get())
         except ValueError: return messagebox.showerror("Input Error", "IDs must be numbers.")
-        result = issue_book(self.db_session, member_id, book_id)
+        self.tasks.submit_db(
+            issue_book, member_id, book_id,
+            on_done=lambda result: self.show_book_issued(result, book_id),
+            on_error=lambda e: messagebox.showerror("DB Error", f"Failed to issue book: {e}"),
+            description="Issuing book"
+        )
+
+    def show_book_issued(self, result, book_id):
         messagebox.showinfo("Result", result["message"]) if result["success"] else messagebox.showerror("Error", result["message"])
         self.update_dashboard_stats() # Update stats after issue
-        self.refresh_book_list() # Refresh book list to show updated available copies
+        self.refresh_book_row(book_id) # Refresh only the issued book's available copies
 
     def create_return_book_form(self, parent):
         return_frame = ttk.LabelFrame(parent, text="Return Book", padding="10 10 10 10")
@@ -503,44 +849,64 @@ class LMSApp:
         ttk.Button(return_frame, text="Return Book", command=self.handle_return_book).grid(row=1, column=0, columnspan=2, pady=10)
 
     def handle_return_book(self):
+        from lms_models import return_book
         try: transaction_id = int(self.return_var.get())
         except ValueError: return messagebox.showerror("Input Error", "ID must be a number.")
-        result = return_book(self.db_session, transaction_id)
+        self.tasks.submit_db(
+            return_book, transaction_id,
+            on_done=self.show_book_returned,
+            on_error=lambda e: messagebox.showerror("DB Error", f"Failed to return book: {e}"),
+            description="Returning book"
+        )
+
+    def show_book_returned(self, result):
         if result["success"]:
             fine_msg = f"Fine: ${result['fine_amount']:.2f}" if result['fine_amount'] > 0 else "No fine."
             messagebox.showinfo("Success", f"{result['message']}\n{fine_msg}")
             self.update_dashboard_stats() # Update stats after return
-            self.refresh_book_list() # Refresh book list to show updated available copies
+            self.refresh_book_row(result["book_id"]) # Refresh only the returned book's available copies
         else: messagebox.showerror("Error", result["message"])
 
+    def refresh_book_row(self, book_id):
+        if hasattr(self, "book_grid"): # The book list exists once its tab has been opened
+            self.book_grid.update_row(book_id)
+
     def create_status_bar(self):
-        self.db_status, self.api_status = tk.StringVar(), tk.StringVar()
+        self.db_status, self.api_status, self.task_status = tk.StringVar(), tk.StringVar(), tk.StringVar(value="Idle")
         status_bar = ttk.Frame(self.master, padding="3 3 3 3", relief=tk.SUNKEN)
         ttk.Label(status_bar, textvariable=self.db_status, style="Status.TLabel").pack(side=tk.LEFT, padx=10)
         ttk.Label(status_bar, textvariable=self.api_status, style="Status.TLabel").pack(side=tk.LEFT, padx=10)
+        ttk.Label(status_bar, textvariable=self.task_status, style="Status.TLabel").pack(side=tk.RIGHT, padx=10)
         status_bar.pack(side=tk.BOTTOM, fill=tk.X)
+        self.tasks.status_var = self.task_status
         
     def update_status_simulated(self):
-        self.db_status.set("Database: Connected")
         self.api_status.set("API: Ready")
+        self.update_metrics_readout()
+
+    def update_metrics_readout(self):
+        """Shows live query/call latency from the instrumentation layer, refreshed every 2 seconds."""
+        self.db_status.set(metrics.status_line() if metrics.enabled else "Database: Connected")
+        self.master.after(2000, self.update_metrics_readout)
 
     def load_initial_data(self):
-        if not self.db_session.query(Member).first():
-            self.db_session.add(Member(membership_number="M001", first_name="Alice", last_name="Smith"))
-            self.db_session.commit()
-            messagebox.showinfo("Setup", "Dummy Member (ID: 1) added for testing.")
-        if not self.db_session.query(Book).first():
-            book_data = lookup_book_by_isbn("9780345391803")
-            if book_data["success"]: add_book_to_db(self.db_session, book_data)
-            messagebox.showinfo("Setup", "Dummy Book (ID: 1) added for testing.")
+        self.tasks.submit_db(seed_initial_data, on_done=self.show_setup_notes, description="Checking sample data")
+
+    def show_setup_notes(self, notes):
+        for note in notes:
+            messagebox.showinfo("Setup", note)
+        if notes:
+            self.update_dashboard_stats()
 
     def placeholder_action(self, name): messagebox.showinfo("Action", f"{name} not implemented.")
     def on_exit(self):
         if messagebox.askyesno("Exit", "Are you sure?"):
-            self.db_session.close()
+            self.tasks.shutdown()
             self.master.quit()
 
 if __name__ == "__main__":
+    # Usage: python main.py [--profile-startup]
+    mark_startup("imported")
     root = tk.Tk()
-    app = LMSApp(root)
+    app = LMSApp(root, profile_startup="--profile-startup" in sys.argv)
     root.mainloop()
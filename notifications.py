@@ -0,0 +1,219 @@
+import itertools
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from lms_api_service import send_email_notification, send_sms_notification
+
+# --- 1. Messages and Transports ---
+
+EMAIL = "email"
+SMS = "sms"
+
+# Largest batch each provider accepts in one API call
+DEFAULT_BATCH_SIZES = {EMAIL: 100, SMS: 50}
+
+_message_ids = itertools.count(1)
+_job_ids = itertools.count(1)
+
+def make_email(to_email: str, subject: str, content: str, tag: str = None) -> dict:
+    """Builds an email message for NotificationDispatcher.submit."""
+    return {"id": next(_message_ids), "channel": EMAIL, "to": to_email, "subject": subject, "body": content, "tag": tag, "attempts": 0}
+
+def make_sms(to_phone: str, message_body: str, tag: str = None) -> dict:
+    """Builds an SMS message for NotificationDispatcher.submit."""
+    return {"id": next(_message_ids), "channel": SMS, "to": to_phone, "subject": None, "body": message_body, "tag": tag, "attempts": 0}
+
+class ConsoleTransport:
+    """Sends through the simulated SendGrid/Twilio functions in lms_api_service."""
+
+    def send(self, channel: str, messages: list) -> list:
+        if channel == EMAIL:
+            return [send_email_notification(m["to"], m["subject"], m["body"]) for m in messages]
+        return [send_sms_notification(m["to"], m["body"]) for m in messages]
+
+class StubTransport:
+    """
+    Records what would have been sent instead of sending it. Useful in tests.
+    'fail' is an optional predicate; messages it returns True for are reported as failed.
+    """
+
+    def __init__(self, fail=None):
+        self.fail = fail
+        self.sent = []
+        self.batches = []
+        self._lock = threading.Lock()
+
+    def send(self, channel: str, messages: list) -> list:
+        results = []
+        with self._lock:
+            self.batches.append((channel, len(messages)))
+            for message in messages:
+                ok = not (self.fail and self.fail(message))
+                if ok:
+                    self.sent.append(dict(message))
+                results.append(ok)
+        return results
+
+# --- 2. Jobs ---
+
+class NotificationJob:
+    """Handle for one submitted group of messages; fills in as the dispatcher works."""
+
+    def __init__(self, messages: list):
+        self.job_id = next(_job_ids)
+        self.total = len(messages)
+        self.queued_by_tag = Counter((m["tag"], m["channel"]) for m in messages)
+        self.results = {} # message id -> True/False
+        self.sent_by_tag = Counter()
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        if self.total == 0:
+            self._done.set()
+
+    def _record(self, message: dict, success: bool):
+        with self._lock:
+            self.results[message["id"]] = success
+            if success:
+                self.sent_by_tag[(message["tag"], message["channel"])] += 1
+            if len(self.results) == self.total:
+                self._done.set()
+
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def wait(self, timeout: float = None) -> bool:
+        """Blocks until every message has succeeded or exhausted its retries."""
+        return self._done.wait(timeout)
+
+    def summary(self) -> dict:
+        with self._lock:
+            sent = sum(1 for ok in self.results.values() if ok)
+            return {
+                "job_id": self.job_id,
+                "total": self.total,
+                "sent": sent,
+                "failed": len(self.results) - sent,
+                "pending": self.total - len(self.results),
+            }
+
+# --- 3. Dispatcher ---
+
+class NotificationDispatcher:
+    """
+    Queues notifications and sends them from a worker pool.
+
+    One collector thread per channel groups queued messages into
+    provider-sized batches and hands them to the pool. Failed messages
+    are retried with exponential backoff up to 'max_retries' times.
+    """
+
+    def __init__(self, transport=None, workers: int = 4, batch_sizes: dict = None,
+                 max_retries: int = 3, retry_delay: float = 1.0, linger: float = 0.05):
+        self.transport = transport or ConsoleTransport()
+        self.batch_sizes = dict(DEFAULT_BATCH_SIZES, **(batch_sizes or {}))
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.linger = linger
+        self.counters = Counter()
+        self.started = time.monotonic()
+        self._jobs = {}
+        self._queues = {channel: queue.Queue() for channel in self.batch_sizes}
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="notify")
+        self._collectors = [
+            threading.Thread(target=self._collect, args=(channel,), name=f"notify-{channel}", daemon=True)
+            for channel in self._queues
+        ]
+        for thread in self._collectors:
+            thread.start()
+
+    def submit(self, messages: list) -> NotificationJob:
+        """Queues messages for delivery and returns immediately with a job handle."""
+        job = NotificationJob(messages)
+        with self._lock:
+            self._in_flight += len(messages)
+        for message in messages:
+            self._jobs[message["id"]] = job
+            self._queues[message["channel"]].put(message)
+        return job
+
+    def stats(self) -> dict:
+        """Returns delivery counters, current backlog depth and throughput."""
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        with self._lock:
+            return {
+                "sent": self.counters["sent"],
+                "failed": self.counters["failed"],
+                "retried": self.counters["retried"],
+                "batches": self.counters["batches"],
+                "backlog": self._in_flight,
+                "queued": {channel: q.qsize() for channel, q in self._queues.items()},
+                "throughput_per_sec": round(self.counters["sent"] / elapsed, 2),
+            }
+
+    def shutdown(self, wait: bool = True):
+        """Stops the collectors; with wait=True, first drains everything already queued."""
+        if wait:
+            while self.stats()["backlog"]:
+                time.sleep(self.linger)
+        self._stopping.set()
+        for thread in self._collectors:
+            thread.join()
+        self._pool.shutdown(wait=wait)
+
+    def _collect(self, channel: str):
+        q = self._queues[channel]
+        batch_size = self.batch_sizes[channel]
+        while not self._stopping.is_set():
+            try:
+                batch = [q.get(timeout=0.2)]
+            except queue.Empty:
+                continue
+            # Linger briefly so bursts of submissions share one provider call
+            deadline = time.monotonic() + self.linger
+            while len(batch) < batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    batch.append(q.get(timeout=remaining) if remaining > 0 else q.get_nowait())
+                except queue.Empty:
+                    break
+            self._pool.submit(self._send_batch, channel, batch)
+
+    def _send_batch(self, channel: str, batch: list):
+        try:
+            results = self.transport.send(channel, batch)
+        except Exception as e:
+            print(f"Notification transport error ({channel}): {e}")
+            results = [False] * len(batch)
+
+        with self._lock:
+            self.counters["batches"] += 1
+        for message, ok in zip(batch, results):
+            if not ok and message["attempts"] < self.max_retries:
+                message["attempts"] += 1
+                with self._lock:
+                    self.counters["retried"] += 1
+                delay = self.retry_delay * (2 ** (message["attempts"] - 1))
+                timer = threading.Timer(delay, self._queues[channel].put, args=(message,))
+                timer.daemon = True
+                timer.start()
+                continue
+            with self._lock:
+                self.counters["sent" if ok else "failed"] += 1
+                self._in_flight -= 1
+            self._jobs.pop(message["id"])._record(message, ok)
+
+_default_dispatcher = None
+_default_lock = threading.Lock()
+
+def get_dispatcher() -> NotificationDispatcher:
+    """Returns the process-wide dispatcher, starting it on first use."""
+    global _default_dispatcher
+    with _default_lock:
+        if _default_dispatcher is None:
+            _default_dispatcher = NotificationDispatcher()
+        return _default_dispatcher
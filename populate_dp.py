@@ -1,11 +1,14 @@
 import requests
 import json
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from itertools import islice
+from sqlalchemy.exc import DataError, IntegrityError
 from sqlalchemy.orm import sessionmaker
-from lms_models import initialize_database, engine, Book, add_book_to_db, Member
-from lms_api_service import GOOGLE_BOOKS_API_URL
+from lms_models import initialize_database, engine, Book, Member, get_existing_isbns, bulk_add_books, register_member
+from lms_api_service import fetch_volume_info, normalize_isbn
 
-# Setup Database Session
-initialize_database()
+# Setup Database Session (sessions connect lazily, so importing this module touches no database)
 Session = sessionmaker(bind=engine)
 db_session = Session()
 
@@ -13,17 +16,12 @@ def fetch_book_details(isbn: str) -> dict:
     """
     Fetches book details from the Google Books API for a given ISBN.
     This is a slightly more robust version of the placeholder in lms_api_service.
+    Lookups go through the shared ISBN metadata cache, so re-imports stay offline.
     """
     try:
-        params = {"q": f"isbn:{isbn}"}
-        response = requests.get(GOOGLE_BOOKS_API_URL, params=params)
-        response.raise_for_status()
+        item = fetch_volume_info(isbn)
         
-        data = response.json()
-        
-        if data.get("totalItems", 0) > 0:
-            item = data["items"][0]["volumeInfo"]
-            
+        if item is not None:
             # Extract image link, prioritizing the largest available thumbnail
             image_links = item.get("imageLinks", {})
             cover_image_url = image_links.get("extraLarge") or \
@@ -52,45 +50,109 @@ def fetch_book_details(isbn: str) -> dict:
     except Exception as e:
         return {"success": False, "message": f"An unexpected error occurred: {e}"}
 
-def populate_books_from_list(isbn_file_path: str):
-    """Reads ISBNs from a file and populates the database."""
-    print("--- Starting Database Population ---")
-    
+def read_isbn_file(isbn_file_path: str) -> list:
+    """
+    Reads ISBNs from a file, skipping comments, blank lines and duplicates.
+    Hyphens and spaces are stripped first, so '978-0-345-39180-3' and
+    '9780345391803' are one book for the existing-ISBN check and the cache.
+    """
     with open(isbn_file_path, 'r') as f:
-        isbns = [line.strip() for line in f if line.strip() and not line.startswith('#')]
+        isbns = [normalize_isbn(line) for line in f if line.strip() and not line.startswith('#')]
+    # dict.fromkeys keeps the file order while dropping repeats
+    return list(dict.fromkeys(isbns))
 
-    for i, isbn in enumerate(isbns):
-        print(f"[{i+1}/{len(isbns)}] Processing ISBN: {isbn}...")
-        
-        # Check if book already exists to avoid unnecessary API calls
-        if db_session.query(Book).filter(Book.isbn == isbn).first():
-            print(f"Book with ISBN {isbn} already exists. Skipping API call.")
-            continue
+def fetch_books_concurrently(isbns, max_in_flight: int = 16):
+    """
+    Fetches book details for the given ISBNs from a bounded worker pool.
+    At most 'max_in_flight' requests are outstanding at any time.
+    Yields (isbn, book_data) pairs in completion order.
+    """
+    isbn_iter = iter(isbns)
+    with ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+        pending = {}
+        for isbn in islice(isbn_iter, max_in_flight):
+            pending[executor.submit(fetch_book_details, isbn)] = isbn
 
-        book_data = fetch_book_details(isbn)
-        
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                isbn = pending.pop(future)
+                yield isbn, future.result()
+
+                # Refill the window as each request completes
+                next_isbn = next(isbn_iter, None)
+                if next_isbn is not None:
+                    pending[executor.submit(fetch_book_details, next_isbn)] = next_isbn
+
+def populate_books_from_list(isbn_file_path: str, max_in_flight: int = 16, batch_size: int = 500, progress_every: int = 100, session=None):
+    """
+    Reads ISBNs from a file and populates the database.
+
+    Existing ISBNs are filtered out with one set-based check, the rest are
+    fetched concurrently and inserted in chunked transactions of 'batch_size'.
+    'session' defaults to this module's db_session.
+    """
+    db = session or db_session
+    print("--- Starting Database Population ---")
+    started = time.perf_counter()
+
+    isbns = read_isbn_file(isbn_file_path)
+    existing = get_existing_isbns(db, isbns)
+    to_fetch = [isbn for isbn in isbns if isbn not in existing]
+    print(f"{len(isbns)} unique ISBNs read, {len(existing)} already in the database, {len(to_fetch)} to fetch.")
+
+    summary = {"added": 0, "failed": 0, "skipped": len(existing)}
+    batch = []
+
+    def flush_batch():
+        try:
+            summary["added"] += bulk_add_books(db, batch)
+        except (IntegrityError, DataError):
+            # Some row in this batch was rejected; retry row by row so only that row fails
+            db.rollback()
+            for book_data in batch:
+                try:
+                    summary["added"] += bulk_add_books(db, [book_data])
+                except (IntegrityError, DataError) as e:
+                    db.rollback()
+                    summary["failed"] += 1
+                    print(f"  DB ERROR: {book_data['isbn']}: {e.orig}")
+        except Exception as e:
+            print(f"  DB ERROR: Could not add batch of {len(batch)} books. Error: {e}")
+            db.rollback()
+            summary["failed"] += len(batch)
+        batch.clear()
+
+    for processed, (isbn, book_data) in enumerate(fetch_books_concurrently(to_fetch, max_in_flight), start=1):
         if book_data["success"]:
-            try:
-                # Add book to DB (add_book_to_db handles the commit)
-                new_book = add_book_to_db(db_session, book_data)
-                print(f"  SUCCESS: Added/Updated book: {new_book.title}")
-            except Exception as e:
-                print(f"  DB ERROR: Could not add book {isbn}. Error: {e}")
-                db_session.rollback()
+            batch.append(book_data)
+            if len(batch) >= batch_size:
+                flush_batch()
         else:
-            print(f"  FAILURE: {book_data['message']}")
+            summary["failed"] += 1
+            print(f"  FAILURE: {isbn}: {book_data['message']}")
+
+        if processed % progress_every == 0 or processed == len(to_fetch):
+            elapsed = time.perf_counter() - started
+            rate = processed / elapsed if elapsed > 0 else 0.0
+            print(f"[{processed}/{len(to_fetch)}] fetched, {summary['added']} added, {summary['failed']} failed ({rate:.1f} ISBNs/sec)")
+
+    if batch:
+        flush_batch()
 
-    print("--- Database Population Complete ---")
+    elapsed = time.perf_counter() - started
+    summary["elapsed_seconds"] = round(elapsed, 2)
+    print(f"--- Database Population Complete: {summary['added']} added, {summary['failed']} failed, {summary['skipped']} skipped in {elapsed:.1f}s ---")
+    return summary
 
 def ensure_dummy_member():
     """Ensures a dummy member exists for testing transactions."""
     if not db_session.query(Member).filter(Member.membership_number == "M001").first():
-        dummy_member = Member(membership_number="M001", first_name="Alice", last_name="Smith", email="alice@example.com", phone="555-1234")
-        db_session.add(dummy_member)
-        db_session.commit()
+        register_member(db_session, {"membership_number": "M001", "first_name": "Alice", "last_name": "Smith", "email": "alice@example.com", "phone": "555-1234"})
         print("Ensured dummy member (Alice Smith) exists.")
 
 if __name__ == "__main__":
+    initialize_database()
     ensure_dummy_member()
     populate_books_from_list("isbn_list.txt")
     db_session.close()
@@ -0,0 +1,358 @@
+import json
+import math
+import sys
+import time
+from collections import Counter, defaultdict
+from sqlalchemy import Column, Integer, String, Float, Index, func, desc, select, literal, union_all, case, and_, bindparam
+from sqlalchemy.dialects import postgresql, sqlite
+from lms_models import Base, SessionLocal, engine, Book, Transaction, BookReview
+
+# --- 1. Recommendation Tables ---
+# member_book_weights is the sparse member x book interaction matrix;
+# book_cooccurrence is the item-item matrix derived from it (both directions
+# of each pair); book_similarity holds the precomputed top-k lists served to readers.
+
+class MemberBookWeight(Base):
+    __tablename__ = "member_book_weights"
+    __table_args__ = {"sqlite_with_rowid": False} # Rows are stored in the primary key b-tree, not twice
+
+    member_id = Column(Integer, primary_key=True)
+    book_id = Column(Integer, primary_key=True)
+    weight = Column(Float, nullable=False)
+
+class BookCooccurrence(Base):
+    __tablename__ = "book_cooccurrence"
+    __table_args__ = {"sqlite_with_rowid": False}
+
+    book_id = Column(Integer, primary_key=True)
+    other_book_id = Column(Integer, primary_key=True)
+    weight = Column(Float, nullable=False, default=0.0) # Sum over members of w(book) * w(other)
+
+class BookNorm(Base):
+    __tablename__ = "book_norms"
+    __table_args__ = (Index("ix_book_norms_weight", "weight"),)
+
+    book_id = Column(Integer, primary_key=True)
+    weight = Column(Float, nullable=False, default=0.0) # Sum over members of w(book)^2
+    length = Column(Float, nullable=False, default=0.0) # sqrt(weight), kept here as not every SQLite build has sqrt()
+
+class BookSimilarity(Base):
+    __tablename__ = "book_similarity"
+    __table_args__ = {"sqlite_with_rowid": False}
+
+    book_id = Column(Integer, primary_key=True)
+    rank = Column(Integer, primary_key=True)
+    similar_book_id = Column(Integer, nullable=False)
+    score = Column(Float, nullable=False)
+
+class RecommendationState(Base):
+    __tablename__ = "recommendation_state"
+
+    name = Column(String, primary_key=True)
+    value = Column(String)
+
+RECOMMENDATION_TABLES = [t.__table__ for t in (MemberBookWeight, BookCooccurrence, BookNorm, BookSimilarity, RecommendationState)]
+
+TOP_K = 50
+MAX_BASKET_SIZE = 100 # Only a member's most recent books count; keeps heavy borrowers from dominating the cost
+BORROW_WEIGHT = 1.0
+REVIEW_WEIGHTS = {5: 1.0, 4: 0.5, 3: 0.0, 2: -0.5, 1: -1.0} # Added to the borrow weight; a 1-star review cancels it
+MIN_WEIGHT = 1e-9
+
+def initialize_recommendations(bind=None):
+    """Creates the recommendation tables if they do not exist."""
+    Base.metadata.create_all(bind=bind or engine, tables=RECOMMENDATION_TABLES)
+
+# --- 2. Building the Matrices (set-based, inside the database) ---
+
+def _chunks(items: list, size: int = 500):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def _basket_select(max_transaction_id: int, max_review_id: int, member_ids: list = None):
+    """
+    SELECT of (member_id, book_id, weight) from loans and reviews up to the
+    given ids. Each borrowed book weighs BORROW_WEIGHT, adjusted by the
+    member's latest rating of it; only the MAX_BASKET_SIZE most recent books are kept.
+    """
+    loans = select(
+        Transaction.member_id, Transaction.book_id, literal(1).label("borrowed"), Transaction.issue_date.label("seen")
+    ).where(Transaction.transaction_id <= max_transaction_id)
+    reviews = select(
+        BookReview.member_id, BookReview.book_id, literal(0).label("borrowed"), BookReview.review_date.label("seen")
+    ).where(BookReview.review_id <= max_review_id)
+    if member_ids is not None:
+        loans = loans.where(Transaction.member_id.in_(member_ids))
+        reviews = reviews.where(BookReview.member_id.in_(member_ids))
+    events = union_all(loans, reviews).subquery("events")
+
+    latest_rating = select(BookReview.rating).where(
+        BookReview.member_id == events.c.member_id, BookReview.book_id == events.c.book_id,
+        BookReview.review_id <= max_review_id
+    ).order_by(desc(BookReview.review_id)).limit(1).scalar_subquery()
+    weight = func.max(events.c.borrowed) * BORROW_WEIGHT + case(REVIEW_WEIGHTS, value=latest_rating, else_=0.0)
+    recency = func.row_number().over(
+        partition_by=events.c.member_id,
+        order_by=(func.max(events.c.seen).desc().nulls_last(), events.c.book_id.desc())
+    )
+    ranked = select(
+        events.c.member_id, events.c.book_id, weight.label("weight"), recency.label("recency")
+    ).group_by(events.c.member_id, events.c.book_id).having(weight > 0).subquery("ranked")
+    return select(ranked.c.member_id, ranked.c.book_id, ranked.c.weight).where(ranked.c.recency <= MAX_BASKET_SIZE)
+
+def _update_lengths(db_session, book_ids: list = None):
+    """Sets book_norms.length = sqrt(weight) for the given books (or all)."""
+    query = db_session.query(BookNorm.book_id, BookNorm.weight)
+    chunks = [None] if book_ids is None else _chunks(book_ids)
+    norms_table = BookNorm.__table__
+    statement = norms_table.update().where(norms_table.c.book_id == bindparam("b_id")).values(length=bindparam("len"))
+    for chunk in chunks:
+        rows = query if chunk is None else query.filter(BookNorm.book_id.in_(chunk))
+        params = [{"b_id": row.book_id, "len": math.sqrt(max(row.weight, 0.0))} for row in rows]
+        if params:
+            db_session.execute(statement, params)
+
+def _rescore(db_session, book_ids: list = None, k: int = TOP_K) -> int:
+    """Recomputes the cosine top-k lists of the given books (or all) from the stored matrix."""
+    written = 0
+    for chunk in [None] if book_ids is None else _chunks(book_ids):
+        this_book, other_book = BookNorm.__table__.alias("this_book"), BookNorm.__table__.alias("other_book")
+        pairs = BookCooccurrence.__table__
+        score = pairs.c.weight / (this_book.c.length * other_book.c.length)
+        ranked = select(
+            pairs.c.book_id, pairs.c.other_book_id, score.label("score"),
+            func.row_number().over(partition_by=pairs.c.book_id, order_by=(score.desc(), pairs.c.other_book_id)).label("rank")
+        ).select_from(
+            pairs.join(this_book, this_book.c.book_id == pairs.c.book_id).join(other_book, other_book.c.book_id == pairs.c.other_book_id)
+        ).where(pairs.c.weight > MIN_WEIGHT, this_book.c.length > 0, other_book.c.length > 0)
+        delete = BookSimilarity.__table__.delete()
+        if chunk is not None:
+            ranked = ranked.where(pairs.c.book_id.in_(chunk))
+            delete = delete.where(BookSimilarity.book_id.in_(chunk))
+        ranked = ranked.subquery("ranked")
+
+        db_session.execute(delete)
+        written += db_session.execute(BookSimilarity.__table__.insert().from_select(
+            ["book_id", "rank", "similar_book_id", "score"],
+            select(ranked.c.book_id, ranked.c.rank, ranked.c.other_book_id, ranked.c.score).where(ranked.c.rank <= k)
+        )).rowcount
+    return written
+
+def _set_state(db_session, name: str, value):
+    db_session.merge(RecommendationState(name=name, value=str(value)))
+
+def _get_state(db_session, name: str, default=None):
+    row = db_session.query(RecommendationState.value).filter(RecommendationState.name == name).first()
+    return row.value if row else default
+
+def rebuild_recommendations(db_session, k: int = TOP_K) -> dict:
+    """
+    Rebuilds every matrix and top-k list from scratch. Each step is one
+    INSERT ... SELECT, so the pair expansion and ranking run inside the database.
+    """
+    started = time.perf_counter()
+    max_transaction_id = db_session.query(func.max(Transaction.transaction_id)).scalar() or 0
+    max_review_id = db_session.query(func.max(BookReview.review_id)).scalar() or 0
+    for table in RECOMMENDATION_TABLES:
+        db_session.execute(table.delete())
+
+    weights = MemberBookWeight.__table__
+    interactions = db_session.execute(weights.insert().from_select(
+        ["member_id", "book_id", "weight"], _basket_select(max_transaction_id, max_review_id)
+    )).rowcount
+
+    a, b = weights.alias("a"), weights.alias("b")
+    pairs = db_session.execute(BookCooccurrence.__table__.insert().from_select(
+        ["book_id", "other_book_id", "weight"],
+        select(a.c.book_id, b.c.book_id, func.sum(a.c.weight * b.c.weight)).select_from(
+            a.join(b, and_(a.c.member_id == b.c.member_id, a.c.book_id != b.c.book_id))
+        ).group_by(a.c.book_id, b.c.book_id)
+    )).rowcount
+    books = db_session.execute(BookNorm.__table__.insert().from_select(
+        ["book_id", "weight"],
+        select(weights.c.book_id, func.sum(weights.c.weight * weights.c.weight)).group_by(weights.c.book_id)
+    )).rowcount
+    _update_lengths(db_session)
+    similarities = _rescore(db_session, None, k)
+
+    _set_state(db_session, "last_transaction_id", max_transaction_id)
+    _set_state(db_session, "last_review_id", max_review_id)
+    db_session.commit()
+    return {
+        "interactions": interactions,
+        "books": books,
+        "pairs": pairs // 2,
+        "similarity_rows": similarities,
+        "elapsed_seconds": round(time.perf_counter() - started, 2),
+    }
+
+# --- 3. Incremental Refresh ---
+
+def _accumulate(cooccurrence, norms, old: dict, new: dict):
+    """
+    Adds the change from one member's old basket to their new one into
+    sparse deltas. Only pairs involving a book whose weight changed are
+    touched; pairs are keyed (smaller id, larger id).
+    """
+    changed = [book_id for book_id in old.keys() | new.keys() if old.get(book_id, 0.0) != new.get(book_id, 0.0)]
+    changed_set = set(changed)
+    everything = list(old.keys() | new.keys())
+    for a in changed:
+        new_a, old_a = new.get(a, 0.0), old.get(a, 0.0)
+        norms[a] += new_a * new_a - old_a * old_a
+        for b in everything:
+            if b == a or (b in changed_set and b < a):
+                continue # Each changed pair is counted once, from its smaller id
+            delta = new_a * new.get(b, 0.0) - old_a * old.get(b, 0.0)
+            if delta:
+                if a < b:
+                    cooccurrence[a][b] += delta
+                else:
+                    cooccurrence[b][a] += delta
+
+def _add_weights(db_session, model, rows: list):
+    """Upserts rows, adding 'weight' onto any existing row with the same primary key."""
+    table = model.__table__
+    dialect = db_session.get_bind().dialect.name
+    for batch in _chunks(rows, 1000):
+        if dialect in ("sqlite", "postgresql"):
+            insert = (sqlite.insert if dialect == "sqlite" else postgresql.insert)(table)
+            statement = insert.on_conflict_do_update(
+                index_elements=[c.name for c in table.primary_key],
+                set_={"weight": table.c.weight + insert.excluded.weight}
+            )
+            db_session.execute(statement, batch)
+            continue
+        for row in batch:
+            existing = db_session.get(model, tuple(row[c.name] for c in table.primary_key))
+            if existing is None:
+                db_session.add(model(**row))
+            else:
+                existing.weight += row["weight"]
+
+def refresh_recommendations(db_session, k: int = TOP_K) -> dict:
+    """
+    Folds loans and reviews added since the last run into the matrices.
+
+    Only members with new activity are re-read; their stored baskets are
+    diffed against the new ones and just the changed pairs are applied.
+    Books whose counts changed are rescored, and so is every partner of a
+    book whose length changed (its cosine scores against that book moved),
+    so the top-k lists match a full rebuild up to floating-point rounding.
+    """
+    started = time.perf_counter()
+    if _get_state(db_session, "last_transaction_id") is None:
+        return rebuild_recommendations(db_session, k)
+
+    last_transaction_id = int(_get_state(db_session, "last_transaction_id"))
+    last_review_id = int(_get_state(db_session, "last_review_id", 0))
+    max_transaction_id = db_session.query(func.max(Transaction.transaction_id)).scalar() or 0
+    max_review_id = db_session.query(func.max(BookReview.review_id)).scalar() or 0
+
+    members = {row.member_id for row in db_session.query(Transaction.member_id).filter(
+        Transaction.transaction_id > last_transaction_id, Transaction.transaction_id <= max_transaction_id).distinct()}
+    members.update(row.member_id for row in db_session.query(BookReview.member_id).filter(
+        BookReview.review_id > last_review_id, BookReview.review_id <= max_review_id).distinct())
+
+    cooccurrence, norms = defaultdict(Counter), Counter()
+    for chunk in _chunks(sorted(members)):
+        old, new = defaultdict(dict), defaultdict(dict)
+        for row in db_session.query(MemberBookWeight).filter(MemberBookWeight.member_id.in_(chunk)).with_entities(
+                MemberBookWeight.member_id, MemberBookWeight.book_id, MemberBookWeight.weight):
+            old[row.member_id][row.book_id] = row.weight
+        new_rows = db_session.execute(_basket_select(max_transaction_id, max_review_id, chunk)).all()
+        for row in new_rows:
+            new[row.member_id][row.book_id] = row.weight
+        for member_id in chunk:
+            _accumulate(cooccurrence, norms, old.get(member_id, {}), new.get(member_id, {}))
+
+        db_session.query(MemberBookWeight).filter(MemberBookWeight.member_id.in_(chunk)).delete(synchronize_session=False)
+        if new_rows:
+            db_session.execute(MemberBookWeight.__table__.insert(), [dict(row._mapping) for row in new_rows])
+
+    rows = [
+        row for a, items in cooccurrence.items() for b, weight in items.items() if weight
+        for row in ({"book_id": a, "other_book_id": b, "weight": weight}, {"book_id": b, "other_book_id": a, "weight": weight})
+    ]
+    _add_weights(db_session, BookCooccurrence, rows)
+    _add_weights(db_session, BookNorm, [{"book_id": b, "weight": w} for b, w in norms.items() if w])
+
+    touched = sorted({row["book_id"] for row in rows} | {b for b, w in norms.items() if w})
+    for chunk in _chunks(touched):
+        db_session.query(BookCooccurrence).filter(
+            BookCooccurrence.book_id.in_(chunk), BookCooccurrence.weight < MIN_WEIGHT
+        ).delete(synchronize_session=False)
+    _update_lengths(db_session, touched)
+
+    # Pairs are stored in both directions, so a book's partners are its own rows
+    rescore = set(touched)
+    for chunk in _chunks(sorted(b for b, w in norms.items() if w)):
+        rescore.update(row.other_book_id for row in db_session.query(BookCooccurrence.other_book_id).filter(
+            BookCooccurrence.book_id.in_(chunk)))
+    similarities = _rescore(db_session, sorted(rescore), k)
+
+    _set_state(db_session, "last_transaction_id", max_transaction_id)
+    _set_state(db_session, "last_review_id", max_review_id)
+    db_session.commit()
+    return {
+        "members": len(members),
+        "books_rescored": len(rescore),
+        "pairs_changed": len(rows) // 2,
+        "similarity_rows": similarities,
+        "elapsed_seconds": round(time.perf_counter() - started, 2),
+    }
+
+# --- 4. Lookups (served from book_similarity) ---
+
+def similar_books(db_session, book_id: int, k: int = 10) -> list:
+    """Books most often borrowed (and liked) by the same members as 'book_id'."""
+    rows = db_session.query(
+        BookSimilarity.similar_book_id, BookSimilarity.score, Book.title, Book.author
+    ).join(Book, Book.book_id == BookSimilarity.similar_book_id).filter(
+        BookSimilarity.book_id == book_id
+    ).order_by(BookSimilarity.rank).limit(k)
+    return [{"book_id": r.similar_book_id, "title": r.title, "author": r.author, "score": r.score} for r in rows]
+
+def recommend_for_member(db_session, member_id: int, k: int = 10) -> list:
+    """
+    Sums the similarity lists of the books in the member's stored basket,
+    weighted by how much they liked each, and returns the best k they have
+    not borrowed, in one query. Members with no basket yet (or none since the
+    last refresh) get the most borrowed books instead.
+    """
+    borrowed = select(Transaction.book_id).where(Transaction.member_id == member_id)
+    score = func.sum(BookSimilarity.score * MemberBookWeight.weight).label("score")
+    candidates = select(BookSimilarity.similar_book_id.label("book_id"), score).join(
+        MemberBookWeight, MemberBookWeight.book_id == BookSimilarity.book_id
+    ).where(
+        MemberBookWeight.member_id == member_id, BookSimilarity.similar_book_id.not_in(borrowed)
+    ).group_by(BookSimilarity.similar_book_id).order_by(desc(score)).limit(k).subquery("candidates")
+    rows = db_session.execute(
+        select(candidates.c.book_id, candidates.c.score, Book.title, Book.author)
+        .join(Book, Book.book_id == candidates.c.book_id).order_by(desc(candidates.c.score))
+    ).all()
+
+    if not rows:
+        rows = db_session.execute(
+            select(BookNorm.book_id, BookNorm.weight.label("score"), Book.title, Book.author)
+            .join(Book, Book.book_id == BookNorm.book_id).where(BookNorm.book_id.not_in(borrowed))
+            .order_by(desc(BookNorm.weight)).limit(k)
+        ).all()
+    return [{"book_id": r.book_id, "title": r.title, "author": r.author, "score": round(r.score, 6)} for r in rows]
+
+if __name__ == "__main__":
+    # Usage: python recommendations.py rebuild | refresh | similar BOOK_ID | member MEMBER_ID
+    initialize_recommendations()
+    db = SessionLocal()
+    command = sys.argv[1] if len(sys.argv) > 1 else "refresh"
+    if command == "rebuild":
+        print(f"Recommendations rebuilt: {rebuild_recommendations(db)}")
+    elif command == "refresh":
+        print(f"Recommendations refreshed: {refresh_recommendations(db)}")
+    elif command == "similar" and len(sys.argv) > 2:
+        print(json.dumps(similar_books(db, int(sys.argv[2])), indent=4))
+    elif command == "member" and len(sys.argv) > 2:
+        print(json.dumps(recommend_for_member(db, int(sys.argv[2])), indent=4))
+    else:
+        print("Usage: python recommendations.py rebuild | refresh | similar BOOK_ID | member MEMBER_ID")
+    db.close()
@@ -0,0 +1,13 @@
+import pytest
+from benchmarks import create_benchmark_database, remove_benchmark_database
+
+@pytest.fixture
+def db_session():
+    """A session on a throwaway SQLite database with the full schema."""
+    bench_engine, Session, path = create_benchmark_database()
+    session = Session()
+    try:
+        yield session
+    finally:
+        session.close()
+        remove_benchmark_database(bench_engine, path)
@@ -0,0 +1,29 @@
+from lms_models import OBSOLETE_INDEXES, check_query_plans, migrate_indexes
+from sqlalchemy import inspect
+
+EXPECTED_INDEXES = {
+    "overdue": "ix_transactions_status_due_date",
+    "reminder": "ix_transactions_status_due_date",
+    "on_loan_count": ("ix_transactions_status_due_date", "ix_transactions_status_return_date"), # Either has status first
+    "member_history": "ix_transactions_member_id",
+    "book_history": "ix_transactions_book_id",
+    "returns_by_day": "ix_transactions_status_return_date",
+    "next_hold": "ix_holds_queue",
+    "expired_holds": "ix_holds_ready_expires",
+}
+
+def test_hot_queries_use_their_indexes(db_session):
+    plans = check_query_plans(db_session)
+    assert plans.keys() == EXPECTED_INDEXES.keys()
+    for name, indexes in EXPECTED_INDEXES.items():
+        indexes = (indexes,) if isinstance(indexes, str) else indexes
+        assert not plans[name]["full_scan"], plans[name]["plan"]
+        assert any(f"INDEX {index} " in line for line in plans[name]["plan"] for index in indexes), plans[name]["plan"]
+
+def test_migrate_indexes_drops_obsolete_indexes(db_session):
+    bind = db_session.get_bind()
+    with bind.begin() as conn:
+        conn.exec_driver_sql("CREATE INDEX ix_transactions_issued_due_date ON transactions (due_date) WHERE status = 'Issued'")
+    migrate_indexes(bind)
+    names = {index["name"] for index in inspect(bind).get_indexes("transactions")}
+    assert not names & set(OBSOLETE_INDEXES)
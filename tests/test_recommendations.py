@@ -0,0 +1,36 @@
+import pytest
+from lms_models import Transaction, BookReview
+from benchmarks import generate_dataset
+from recommendations import BookSimilarity, initialize_recommendations, rebuild_recommendations, refresh_recommendations
+
+K = 200 # Longer than any list here, so ties at the cut-off cannot differ between the two paths
+
+def similarity_table(db_session) -> dict:
+    return {(row.book_id, row.similar_book_id): row.score for row in db_session.query(BookSimilarity)}
+
+def test_refresh_matches_rebuild(db_session):
+    initialize_recommendations(db_session.get_bind())
+    generate_dataset(db_session, books=80, members=40, transactions=1500, reviews=300)
+
+    # Hold back the newest loans and reviews, build from the rest, then add them back
+    later_loans = [dict(row._mapping) for row in db_session.execute(
+        Transaction.__table__.select().where(Transaction.transaction_id > 1480))]
+    later_reviews = [dict(row._mapping) for row in db_session.execute(
+        BookReview.__table__.select().where(BookReview.review_id > 295))]
+    db_session.query(Transaction).filter(Transaction.transaction_id > 1480).delete()
+    db_session.query(BookReview).filter(BookReview.review_id > 295).delete()
+    db_session.commit()
+    rebuild_recommendations(db_session, K)
+
+    db_session.execute(Transaction.__table__.insert(), later_loans)
+    db_session.execute(BookReview.__table__.insert(), later_reviews)
+    db_session.commit()
+    refresh_recommendations(db_session, K)
+    refreshed = similarity_table(db_session)
+
+    rebuild_recommendations(db_session, K)
+    rebuilt = similarity_table(db_session)
+
+    assert refreshed.keys() == rebuilt.keys()
+    for pair, score in rebuilt.items():
+        assert refreshed[pair] == pytest.approx(score, rel=1e-9, abs=1e-12)